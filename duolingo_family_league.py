@@ -8,7 +8,7 @@ Generates daily/weekly leaderboards and progress reports
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
 from src.config import load_config, get_email_config, get_storage_config
 from src.duolingo_api import (
@@ -17,6 +17,7 @@ from src.duolingo_api import (
     calculate_weekly_xp_per_language,
 )
 from src.storage_factory import StorageFactory
+from src.storage_interface import StorageInterface
 from src.report_generator import generate_daily_report, generate_weekly_report
 from src.html_report_generator import (
     generate_daily_html_report,
@@ -176,14 +177,23 @@ def main():
     email_config = get_email_config(config)
     storage_config = get_storage_config(config)
 
-    # Initialize data storage using factory
-    storage = StorageFactory.create_storage(
+    # Initialize data storage using factory, closing it once the run is done
+    with StorageFactory.create_storage(
         backend=storage_config["backend"],
         data_dir=storage_config["data_dir"],
         db_path=storage_config["sqlite_db_path"],
         gist_id=storage_config.get("gist_id"),
-    )
+    ) as storage:
+        run(args, config, email_config, storage)
+
 
+def run(
+    args: argparse.Namespace,
+    config: dict[str, Any],
+    email_config: dict[str, Any],
+    storage: StorageInterface,
+) -> None:
+    """Check the family and save or report according to the command line"""
     # Load history once for XP calculations
     history = storage.load_history()
 
@@ -193,7 +203,8 @@ def main():
     if args.daily:
         # Daily mode: save data and optionally send daily report
         storage.save_daily_data(results)
-        report = generate_daily_report(results)
+        now = datetime.now()
+        report = generate_daily_report(results, now)
         print("\n" + report)
 
         # Generate HTML report (always needed for emails with i18n support)
@@ -201,7 +212,7 @@ def main():
 
         if args.send_email or should_send_daily(email_config):
             i18n = get_i18n()
-            current_date = datetime.now().strftime(i18n.get("date_format"))
+            current_date = now.strftime(i18n.get("date_format"))
             subject = i18n.get("email_subject_daily", date=current_date)
             send_email(
                 report,
@@ -212,14 +223,14 @@ def main():
             )
 
         # Save report to file
-        report_filename = f"daily_report_{datetime.now().strftime('%Y%m%d')}.txt"
+        date_str = now.strftime("%Y%m%d")
+        report_filename = f"daily_report_{date_str}.txt"
         with open(report_filename, "w") as f:
             f.write(report)
         print(f"\nDaily report saved to {report_filename}")
 
         # Save HTML report if requested
         if args.html:
-            date_str = datetime.now().strftime("%Y%m%d")
             html_path = save_html_report(html_report, "daily", date_str)
             print(f"Daily HTML report saved to {html_path}")
             print("Latest report available at reports/index.html")
@@ -234,7 +245,8 @@ def main():
         # This fixes the bug where Monday morning reports show 0 XP because
         # the calculation uses the new week starting today instead of the
         # completed week that the report should cover.
-        reference_date = datetime.now() - timedelta(days=1)
+        now = datetime.now()
+        reference_date = now - timedelta(days=1)
         for member_name, user_data in results.items():
             if "error" not in user_data:
                 # Recalculate weekly XP using previous week reference
@@ -254,7 +266,7 @@ def main():
                 )
 
         goals = config.get("goals", {})
-        report = generate_weekly_report(results, goals)
+        report = generate_weekly_report(results, goals, now)
         print("\n" + report)
 
         # Generate HTML report (always needed for emails with i18n support)
@@ -262,7 +274,7 @@ def main():
 
         if args.send_email or should_send_weekly(email_config):
             i18n = get_i18n()
-            current_date = datetime.now().strftime(i18n.get("date_format"))
+            current_date = now.strftime(i18n.get("date_format"))
             subject = i18n.get("email_subject_weekly", date=current_date)
             send_email(
                 report,
@@ -272,14 +284,14 @@ def main():
             )
 
         # Save report to file
-        report_filename = f"weekly_report_{datetime.now().strftime('%Y%m%d')}.txt"
+        date_str = now.strftime("%Y%m%d")
+        report_filename = f"weekly_report_{date_str}.txt"
         with open(report_filename, "w") as f:
             f.write(report)
         print(f"\nWeekly report saved to {report_filename}")
 
         # Save HTML report if requested
         if args.html:
-            date_str = datetime.now().strftime("%Y%m%d")
             html_path = save_html_report(html_report, "weekly", date_str)
             print(f"Weekly HTML report saved to {html_path}")
             print("Latest report available at reports/index.html")
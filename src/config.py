@@ -2,20 +2,31 @@
 
 import os
 import re
+from functools import lru_cache
 from typing import Any
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Allowed username characters: letters, numbers, dot, underscore, hyphen
+_USERNAME_RE = re.compile(r"^[a-zA-Z0-9._-]+$")
+# Basic email pattern
+_EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
 
+
+@lru_cache(maxsize=256)
 def validate_username(username: str) -> bool:
-    """Validate username format"""
+    """Validate username format
+
+    Valid usernames are cached; invalid ones raise and are checked again
+    on each call.
+    """
     if not username:
         raise ValueError("Username cannot be empty")
 
     # Check for valid characters (alphanumeric, underscore, hyphen, dot)
-    if not re.match(r"^[a-zA-Z0-9._-]+$", username):
+    if not _USERNAME_RE.match(username):
         raise ValueError(
             f"Invalid username '{username}': only letters, numbers, dots, underscores and hyphens are allowed"
         )
@@ -29,14 +40,13 @@ def validate_username(username: str) -> bool:
     return True
 
 
+@lru_cache(maxsize=256)
 def validate_email(email: str) -> bool:
     """Validate email format"""
     if not email:
         return False
 
-    # Basic email regex pattern
-    email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return re.match(email_pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 
 def load_config() -> dict[str, Any] | None:
@@ -1,10 +1,11 @@
 """Data storage and history management for Duolingo Family League"""
 
-import json
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
+from .json_codec import dumps_bytes, loads
 from .storage_interface import StorageInterface
 
 
@@ -24,8 +25,7 @@ class DataStorage(StorageInterface):
             "results": results,
         }
 
-        with open(daily_file, "w") as f:
-            json.dump(daily_data, f, indent=2)
+        daily_file.write_bytes(dumps_bytes(daily_data, indent=True))
 
         print(f"Daily data saved to {daily_file}")
 
@@ -37,8 +37,7 @@ class DataStorage(StorageInterface):
         history_file = self.data_dir / "league_history.json"
 
         if history_file.exists():
-            with open(history_file, "r") as f:
-                history: list[dict[str, Any]] = json.load(f)
+            history: list[dict[str, Any]] = loads(history_file.read_bytes())
         else:
             history: list[dict[str, Any]] = []
 
@@ -54,18 +53,16 @@ class DataStorage(StorageInterface):
         history.append(entry)
 
         # Sort history by date
-        history = sorted(history, key=lambda x: x["date"])
+        history.sort(key=itemgetter("date"))
 
-        with open(history_file, "w") as f:
-            json.dump(history, f, indent=2)
+        history_file.write_bytes(dumps_bytes(history, indent=True))
 
     def load_history(self) -> list[dict[str, Any]]:
         """Load historical data"""
         history_file = self.data_dir / "league_history.json"
 
         if history_file.exists():
-            with open(history_file, "r") as f:
-                return json.load(f)
+            return loads(history_file.read_bytes())
         return []
 
     def get_weekly_progress(self) -> list[dict[str, Any]]:
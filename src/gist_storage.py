@@ -10,6 +10,7 @@ from typing import Any
 
 import requests
 
+from . import json_codec
 from .storage_interface import StorageInterface
 
 
@@ -59,7 +60,7 @@ class GistStorage(StorageInterface):
         payload = {
             "files": {
                 self.GIST_FILENAME: {
-                    "content": json.dumps(history, indent=2),
+                    "content": json_codec.dumps(history, indent=True),
                 }
             }
         }
@@ -85,11 +86,11 @@ class GistStorage(StorageInterface):
 
         content = history_file.get("content", "[]")
         try:
-            history: list[dict[str, Any]] = json.loads(content)
+            history: list[dict[str, Any]] = json_codec.loads(content)
             self._history_cache = history
             return history
         except json.JSONDecodeError:
-            # Invalid JSON, start fresh
+            # Invalid JSON, start fresh (orjson's decode error subclasses this)
             return []
 
     def save_daily_data(self, results: dict[str, Any]) -> None:
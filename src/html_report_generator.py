@@ -3,9 +3,9 @@
 import html
 from datetime import datetime
 from typing import Any
-from .html_templates import DAILY_REPORT_TEMPLATE, WEEKLY_REPORT_TEMPLATE
+from .html_templates import DAILY_REPORT_PARTS, WEEKLY_REPORT_PARTS, render_template
 from .i18n import get_i18n, translate_language_name
-from .report_generator import generate_leaderboard
+from .report_generator import leaderboard_entry, sort_leaderboard
 
 # Constants
 TOP_POSITIONS_COUNT = 3
@@ -19,7 +19,19 @@ def generate_daily_html_report(results: dict[str, Any]) -> str:
     """Generate a daily progress report in HTML format"""
 
     i18n = get_i18n()
-    leaderboard = generate_leaderboard(results, sort_by="daily")
+    needs_to_practice = i18n.get("needs_to_practice")
+
+    # One pass over the results builds both the standings and the alerts
+    leaderboard: list[dict[str, Any]] = []
+    alerts: list[str] = []
+    for member_name, data in results.items():
+        if "error" in data:
+            continue
+        entry = leaderboard_entry(member_name, data)
+        leaderboard.append(entry)
+        if entry["streak"] == 0:
+            alerts.append(f"<li>{html.escape(entry['name'])} {needs_to_practice}</li>")
+    sort_leaderboard(leaderboard, "daily")
 
     # Generate leaderboard items HTML
     leaderboard_items: list[str] = []
@@ -68,13 +80,6 @@ def generate_daily_html_report(results: dict[str, Any]) -> str:
         )
 
     # Generate streak alerts HTML
-    alerts: list[str] = []
-    for member_name, data in results.items():
-        if "error" not in data and data["streak"] == 0:
-            alerts.append(
-                f"<li>{html.escape(data.get('name', member_name))} {i18n.get('needs_to_practice')}</li>"
-            )
-
     if alerts:
         streak_alerts_html = (
             f'<div class="alert warning"><ul>{"".join(alerts)}</ul></div>'
@@ -85,17 +90,20 @@ def generate_daily_html_report(results: dict[str, Any]) -> str:
     # Format current date
     current_date = datetime.now().strftime(i18n.get("date_format"))
 
-    return DAILY_REPORT_TEMPLATE.format(
-        lang=i18n.language,
-        title=i18n.get("daily_report_title"),
-        header=i18n.get("daily_report_header"),
-        subtitle=i18n.get("daily_report_subtitle"),
-        date=current_date,
-        standings_title=i18n.get("standings_title"),
-        leaderboard_items="".join(leaderboard_items),
-        streak_alerts_title=i18n.get("streak_alerts_title"),
-        streak_alerts=streak_alerts_html,
-        footer_message=i18n.get("keep_learning"),
+    return render_template(
+        DAILY_REPORT_PARTS,
+        {
+            "lang": i18n.language,
+            "title": i18n.get("daily_report_title"),
+            "header": i18n.get("daily_report_header"),
+            "subtitle": i18n.get("daily_report_subtitle"),
+            "date": current_date,
+            "standings_title": i18n.get("standings_title"),
+            "leaderboard_items": "".join(leaderboard_items),
+            "streak_alerts_title": i18n.get("streak_alerts_title"),
+            "streak_alerts": streak_alerts_html,
+            "footer_message": i18n.get("keep_learning"),
+        },
     )
 
 
@@ -103,39 +111,18 @@ def generate_weekly_html_report(results: dict[str, Any], goals: dict[str, Any])
     """Generate comprehensive weekly family report in HTML format"""
 
     i18n = get_i18n()
-    leaderboard = generate_leaderboard(results)
-
-    # Generate leaderboard items HTML
-    leaderboard_items: list[str] = []
-    css_classes = ["first", "second", "third"]
-
-    for i, member in enumerate(leaderboard, 1):
-        if i <= TOP_POSITIONS_COUNT:
-            emoji = POSITION_EMOJIS[i - 1]
-            css_class = css_classes[i - 1]
-        else:
-            emoji = f"{i}."
-            css_class = ""
-
-        # Format streak text
-        streak_count = member["streak"]
-        streak_text = i18n.get(
-            "day_streak" if streak_count == 1 else "days_streak", count=streak_count
-        )
+    streak_goal = goals.get("streak_goal", 7)
+    weekly_goal = goals.get("weekly_xp_goal", 500)
 
-        leaderboard_items.append(
-            f"""
-            <div class="leaderboard-item {css_class}">
-                <div class="position">{emoji}</div>
-                <div class="member-name">{html.escape(member["name"])}</div>
-                <div class="member-stats">
-                    {streak_text} | {i18n.get("weekly_xp", count=member["weekly_xp"])} | {i18n.get("total_xp", count=member["total_xp"])}
-                </div>
-            </div>
-        """.strip()
-        )
+    # Strings that are the same for every member, looked up once
+    streak_achieved = f'<span class="status-badge achieved">🔥 {i18n.get("streak_goal_achieved")}</span>'
+    streak_progress = f'<span class="status-badge progress">⚡ {i18n.get("good_progress_streak", goal=streak_goal)}</span>'
+    streak_warning = f'<span class="status-badge warning">⚠️ {i18n.get("work_needed_streak", goal=streak_goal)}</span>'
+    not_started = i18n.get("not_started_yet")
 
-    # Generate detailed member progress HTML
+    # One pass over the results builds the leaderboard and the member
+    # details, which keep the original member order
+    leaderboard: list[dict[str, Any]] = []
     member_details: list[str] = []
     for member_name, data in results.items():
         if "error" in data:
@@ -156,21 +143,21 @@ def generate_weekly_html_report(results: dict[str, Any], goals: dict[str, Any])
             )
             continue
 
+        leaderboard.append(leaderboard_entry(member_name, data))
+
         # Format streak text
         streak_count = data["streak"]
         streak_text = i18n.get("current_streak", count=streak_count)
 
         # Generate streak status badge
-        streak_goal = goals.get("streak_goal", 7)
-        if data["streak"] >= streak_goal:
-            streak_status = f'<span class="status-badge achieved">🔥 {i18n.get("streak_goal_achieved")}</span>'
-        elif data["streak"] >= streak_goal // 2:
-            streak_status = f'<span class="status-badge progress">⚡ {i18n.get("good_progress_streak", goal=streak_goal)}</span>'
+        if streak_count >= streak_goal:
+            streak_status = streak_achieved
+        elif streak_count >= streak_goal // 2:
+            streak_status = streak_progress
         else:
-            streak_status = f'<span class="status-badge warning">⚠️ {i18n.get("work_needed_streak", goal=streak_goal)}</span>'
+            streak_status = streak_warning
 
         # Generate weekly XP status badge
-        weekly_goal = goals.get("weekly_xp_goal", 500)
         if data["weekly_xp"] >= weekly_goal:
             xp_status = f'<span class="status-badge achieved">🎯 {i18n.get("weekly_xp_goal_achieved", current=data["weekly_xp"], goal=weekly_goal)}</span>'
         else:
@@ -207,7 +194,7 @@ def generate_weekly_html_report(results: dict[str, Any], goals: dict[str, Any])
                     language_items.append(
                         f"""
                         <div class="language-item">
-                            <span class="language-name">{html.escape(translate_language_name(lang))}:</span> {i18n.get("not_started_yet")}
+                            <span class="language-name">{html.escape(translate_language_name(lang))}:</span> {not_started}
                         </div>
                     """.strip()
                     )
@@ -248,12 +235,42 @@ def generate_weekly_html_report(results: dict[str, Any], goals: dict[str, Any])
         """.strip()
         )
 
+    sort_leaderboard(leaderboard, "weekly")
+
+    # Generate leaderboard items HTML
+    leaderboard_items: list[str] = []
+    css_classes = ["first", "second", "third"]
+
+    for i, member in enumerate(leaderboard, 1):
+        if i <= TOP_POSITIONS_COUNT:
+            emoji = POSITION_EMOJIS[i - 1]
+            css_class = css_classes[i - 1]
+        else:
+            emoji = f"{i}."
+            css_class = ""
+
+        # Format streak text
+        streak_count = member["streak"]
+        streak_text = i18n.get(
+            "day_streak" if streak_count == 1 else "days_streak", count=streak_count
+        )
+
+        leaderboard_items.append(
+            f"""
+            <div class="leaderboard-item {css_class}">
+                <div class="position">{emoji}</div>
+                <div class="member-name">{html.escape(member["name"])}</div>
+                <div class="member-stats">
+                    {streak_text} | {i18n.get("weekly_xp", count=member["weekly_xp"])} | {i18n.get("total_xp", count=member["total_xp"])}
+                </div>
+            </div>
+        """.strip()
+        )
+
     # Generate goals list HTML
-    streak_goal = goals.get("streak_goal", 7)
-    weekly_xp_goal = goals.get("weekly_xp_goal", 500)
     goals_list: list[str] = [
         f"<li>{i18n.get('maintain_streak_goal', goal=streak_goal)}</li>",
-        f"<li>{i18n.get('earn_xp_goal', goal=weekly_xp_goal)}</li>",
+        f"<li>{i18n.get('earn_xp_goal', goal=weekly_goal)}</li>",
         f"<li>{i18n.get('beat_personal_best')}</li>",
     ]
 
@@ -262,19 +279,22 @@ def generate_weekly_html_report(results: dict[str, Any], goals: dict[str, Any])
     week_ending = current_date.strftime(i18n.get("date_format"))
     generated_date = current_date.strftime(i18n.get("datetime_format"))
 
-    return WEEKLY_REPORT_TEMPLATE.format(
-        lang=i18n.language,
-        title=i18n.get("weekly_report_title"),
-        header=i18n.get("weekly_report_header"),
-        subtitle=i18n.get("weekly_report_subtitle"),
-        week_ending=i18n.get("week_ending", date=week_ending),
-        generated_date=i18n.get("generated_date", date=generated_date),
-        family_leaderboard_title=i18n.get("family_leaderboard_title"),
-        leaderboard_items="".join(leaderboard_items),
-        detailed_progress_title=i18n.get("detailed_progress_title"),
-        member_details="".join(member_details),
-        goals_title=i18n.get("goals_title"),
-        goals_list="".join(goals_list),
-        keep_up_message=i18n.get("keep_up_message"),
-        footer_message=i18n.get("keep_learning"),
+    return render_template(
+        WEEKLY_REPORT_PARTS,
+        {
+            "lang": i18n.language,
+            "title": i18n.get("weekly_report_title"),
+            "header": i18n.get("weekly_report_header"),
+            "subtitle": i18n.get("weekly_report_subtitle"),
+            "week_ending": i18n.get("week_ending", date=week_ending),
+            "generated_date": i18n.get("generated_date", date=generated_date),
+            "family_leaderboard_title": i18n.get("family_leaderboard_title"),
+            "leaderboard_items": "".join(leaderboard_items),
+            "detailed_progress_title": i18n.get("detailed_progress_title"),
+            "member_details": "".join(member_details),
+            "goals_title": i18n.get("goals_title"),
+            "goals_list": "".join(goals_list),
+            "keep_up_message": i18n.get("keep_up_message"),
+            "footer_message": i18n.get("keep_learning"),
+        },
     )
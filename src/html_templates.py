@@ -1,5 +1,12 @@
 """HTML template definitions for Duolingo Family League reports"""
 
+import string
+from collections.abc import Mapping
+from typing import Any
+
+# A template split into (literal text, field name) pairs
+TemplateParts = tuple[tuple[str, str | None], ...]
+
 DAILY_REPORT_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="{lang}">
@@ -365,3 +372,23 @@ WEEKLY_REPORT_TEMPLATE = """
 </body>
 </html>
 """
+
+
+def _split_template(template: str) -> TemplateParts:
+    """Split a str.format template into literal text and field names"""
+    return tuple(
+        (literal, name) for literal, name, _, _ in string.Formatter().parse(template)
+    )
+
+
+def render_template(parts: TemplateParts, fields: Mapping[str, Any]) -> str:
+    """Render split template parts; same output as template.format_map(fields)"""
+    return "".join(
+        literal if name is None else literal + str(fields[name])
+        for literal, name in parts
+    )
+
+
+# The report templates are large (mostly CSS), so parse them once at import
+DAILY_REPORT_PARTS = _split_template(DAILY_REPORT_TEMPLATE)
+WEEKLY_REPORT_PARTS = _split_template(WEEKLY_REPORT_TEMPLATE)
@@ -2,84 +2,144 @@
 
 import json
 import os
+import string
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, ClassVar, cast
+
+# Translation files live in the project root (parent of src)
+TRANSLATIONS_DIR = Path(__file__).parent.parent / "translations"
+
+# Used when no translation files can be found at all
+FALLBACK_TRANSLATIONS: dict[str, Any] = {
+    "daily_report_title": "Duolingo Family League - Daily Update",
+    "daily_report_header": "DUOLINGO FAMILY LEAGUE - DAILY UPDATE",
+    "keep_learning": "Keep learning! 🌟",
+}
+
+# (literal_text, field_name, format_spec) segments from string.Formatter.parse
+Segment = tuple[str, str | None, str]
+
+_FORMATTER = string.Formatter()
+
+_MISSING = object()
+
+# Every translated string, keyed by (language, dotted key)
+_FLAT: dict[tuple[str, str], Any] = {}
+
+# Templates parsed once per (language, dotted key); None means "use str.format"
+_PARSED: dict[tuple[str, str], list[Segment] | None] = {}
+
+
+def _parse_template(template: str) -> list[Segment] | None:
+    """Split a template into segments, or None if it needs full str.format"""
+    segments: list[Segment] = []
+    try:
+        for literal, name, spec, conversion in _FORMATTER.parse(template):
+            # Only plain named fields take the fast path
+            if name is not None and (
+                conversion or not name.isidentifier() or "{" in (spec or "")
+            ):
+                return None
+            segments.append((literal, name, spec or ""))
+    except ValueError:
+        return None
+    return segments
+
+
+def _index_table(language: str, table: dict[str, Any], prefix: str = "") -> None:
+    """Flatten a translation table into _FLAT and parse its templates"""
+    for key, value in table.items():
+        dotted_key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            _index_table(language, cast(dict[str, Any], value), f"{dotted_key}.")
+            continue
+
+        _FLAT[(language, dotted_key)] = value
+        if isinstance(value, str) and "{" in value:
+            _PARSED[(language, dotted_key)] = _parse_template(value)
+
+
+def _render(segments: list[Segment], kwargs: dict[str, Any]) -> str:
+    """Render pre-parsed template segments"""
+    return "".join(
+        literal if name is None else literal + format(kwargs[name], spec)
+        for literal, name, spec in segments
+    )
 
 
 class I18n:
-    """Simple internationalization class for managing translations"""
+    """Simple internationalization class for managing translations
+
+    Translation tables are loaded lazily, one language at a time, on first use
+    and shared between all instances.
+    """
+
+    _TABLES: ClassVar[dict[str, dict[str, Any]]] = {}
+    _available_languages: ClassVar[list[str] | None] = None
 
     def __init__(self, language: str = "en"):
         """Initialize with specified language"""
         self.language = language
-        self._translations: Dict[str, Dict[str, str]] = {}
-        self._load_translations()
-
-    def _load_translations(self) -> None:
-        """Load translation strings from JSON files"""
-        # Get the project root directory (parent of src)
-        project_root = Path(__file__).parent.parent
-        translations_dir = project_root / "translations"
-
-        self._translations = {}
-
-        # Load all JSON files in the translations directory
-        if translations_dir.exists():
-            for json_file in translations_dir.glob("*.json"):
-                language_code = json_file.stem
-                try:
-                    with open(json_file, "r", encoding="utf-8") as f:
-                        self._translations[language_code] = json.load(f)
-                except (json.JSONDecodeError, IOError) as e:
-                    print(
-                        f"Warning: Could not load translations for {language_code}: {e}"
-                    )
-
-        # Fallback to English if no translations were loaded
-        if not self._translations:
-            print(
-                "Warning: No translation files found, using fallback English translations"
-            )
-            self._translations = {
-                "en": {
-                    "daily_report_title": "Duolingo Family League - Daily Update",
-                    "daily_report_header": "DUOLINGO FAMILY LEAGUE - DAILY UPDATE",
-                    "keep_learning": "Keep learning! 🌟",
-                }
-            }
+
+    @classmethod
+    def _list_languages(cls) -> list[str]:
+        """List language codes from the translations directory (read once)"""
+        if cls._available_languages is None:
+            languages: list[str] = []
+            if TRANSLATIONS_DIR.exists():
+                languages = sorted(f.stem for f in TRANSLATIONS_DIR.glob("*.json"))
+
+            if not languages:
+                print(
+                    "Warning: No translation files found, using fallback English translations"
+                )
+                cls._TABLES["en"] = FALLBACK_TRANSLATIONS
+                _index_table("en", FALLBACK_TRANSLATIONS)
+                languages = ["en"]
+
+            cls._available_languages = languages
+
+        return cls._available_languages
+
+    @classmethod
+    def get_table(cls, language: str) -> dict[str, Any] | None:
+        """Get the translation table for a language, loading it on first use"""
+        table = cls._TABLES.get(language)
+        if table is not None:
+            return table
+
+        if language not in cls._list_languages():
+            return None
+
+        json_file = TRANSLATIONS_DIR / f"{language}.json"
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                table = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Could not load translations for {language}: {e}")
+            # Don't try again on every lookup
+            cls._available_languages = [
+                lang for lang in cls._list_languages() if lang != language
+            ]
+            return None
+
+        _index_table(language, table)
+        cls._TABLES[language] = table
+        return table
 
     def get(self, key: str, default: str | None = None, **kwargs: Any) -> str:
         """Get translated string with optional formatting parameters"""
-        # Handle nested keys like "languages.Spanish"
-        keys = key.split(".")
-
-        if self.language not in self._translations:
-            # Fallback to English if language not found
-            translation_dict = self._translations.get("en", {})
-        else:
-            translation_dict = self._translations[self.language]
-
-        # Navigate through nested keys
-        translation = translation_dict
-        for k in keys:
-            if isinstance(translation, dict) and k in translation:
-                translation = translation[k]
-            else:
-                translation = default if default is not None else key
-                break
-
-        # If we ended up with a dict, return the default/key
-        if isinstance(translation, dict):
-            translation = default if default is not None else key
-
-        if kwargs:
-            try:
-                return translation.format(**kwargs)
-            except (KeyError, ValueError):
-                # If formatting fails, return the unformatted string
-                return translation
-
-        return translation
+        # The type is part of the key so that 1, 1.0 and True are cached apart
+        items = tuple(
+            (name, value.__class__, value) for name, value in sorted(kwargs.items())
+        )
+        try:
+            hash(items)
+        except TypeError:
+            # Unhashable formatting arguments can't be cached
+            return _translate(self.language, key, default, kwargs)
+        return _format_cached(self.language, key, default, items)
 
     def set_language(self, language: str) -> None:
         """Change the current language"""
@@ -87,7 +147,46 @@ class I18n:
 
     def get_available_languages(self) -> list[str]:
         """Get list of available language codes"""
-        return list(self._translations.keys())
+        return list(self._list_languages())
+
+
+def _translate(
+    language: str, key: str, default: str | None, kwargs: dict[str, Any]
+) -> str:
+    """Look up and format a translation string"""
+    if I18n.get_table(language) is None:
+        # Fallback to English if language not found
+        language = "en"
+        I18n.get_table("en")
+
+    # Nested keys like "languages.Spanish" are stored flattened
+    translation = _FLAT.get((language, key), _MISSING)
+    found = translation is not _MISSING
+    if not found:
+        translation = default if default is not None else key
+
+    if kwargs:
+        segments = _PARSED.get((language, key)) if found else None
+        try:
+            if segments is not None:
+                return _render(segments, kwargs)
+            return translation.format(**kwargs)
+        except (KeyError, ValueError):
+            # If formatting fails, return the unformatted string
+            return translation
+
+    return translation
+
+
+@lru_cache(maxsize=4096)
+def _format_cached(
+    language: str,
+    key: str,
+    default: str | None,
+    items: tuple[tuple[str, type[Any], Any], ...],
+) -> str:
+    """Memoized _translate, keyed by language, key and formatting arguments"""
+    return _translate(language, key, default, {name: value for name, _, value in items})
 
 
 def get_language_from_env() -> str:
@@ -1,13 +1,67 @@
 """Data migration utilities for converting between JSON and SQLite storage backends"""
 
-import json
+import sys
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 from typing import Any, cast
 
-from .data_storage import DataStorage
-from .sqlite_storage import SQLiteStorage
+from .json_codec import dumps_bytes
 from .storage_interface import StorageInterface
 
+# Per-user fields compared by validate_migration
+CORE_FIELDS = ("streak", "total_xp", "weekly_xp")
+
+# Mismatches listed by validate_migration(fail_fast=False) before it stops
+MAX_REPORTED_MISMATCHES = 10
+
+# Threads writing exported daily files
+EXPORT_WRITE_WORKERS = 8
+
+
+def _print_lines(lines: list[str]) -> None:
+    """Print collected messages with a single write"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _iter_mismatches(
+    source_history: list[dict[str, Any]], target_history: list[dict[str, Any]]
+) -> Iterator[str]:
+    """Yield a message for each difference between two histories"""
+    for source_entry, target_entry in zip(source_history, target_history):
+        date = source_entry["date"]
+        if date != target_entry["date"]:
+            yield f"❌ Date mismatch: {date} != {target_entry['date']}"
+            continue
+
+        # Compare user data
+        source_results = source_entry["results"]
+        target_results = target_entry["results"]
+
+        if source_results.keys() != target_results.keys():
+            yield f"❌ User set mismatch for {date}"
+            continue
+
+        # Check core fields for each user
+        for username, user_data in source_results.items():
+            source_user = cast(dict[str, Any], user_data)
+            if "error" in source_user:
+                continue  # Skip error entries
+
+            target_user = cast(dict[str, Any], target_results[username])
+            source_values = tuple(source_user.get(f) for f in CORE_FIELDS)
+            target_values = tuple(target_user.get(f) for f in CORE_FIELDS)
+            if source_values == target_values:
+                continue
+
+            for field, source_value, target_value in zip(
+                CORE_FIELDS, source_values, target_values
+            ):
+                if source_value != target_value:
+                    yield f"❌ Field mismatch for {username} on {date}: {field}"
+
 
 class StorageMigrator:
     """Utility class for migrating data between storage backends"""
@@ -28,53 +82,55 @@ class StorageMigrator:
             f"Starting migration from JSON ({json_data_dir}) to SQLite ({sqlite_db_path})"
         )
 
+        from .data_storage import DataStorage
+        from .sqlite_storage import SQLiteStorage
+
         # Initialize storages
         json_storage = DataStorage(json_data_dir)
-        sqlite_storage = SQLiteStorage(sqlite_db_path)
-
-        # Load all historical data from JSON
-        history = json_storage.load_history()
-
-        if not history:
-            print("No historical data found in JSON files")
-            return
-
-        print(f"Found {len(history)} historical entries to migrate")
-
-        # Migrate each historical entry
-        migrated_count = 0
-        for entry in history:
-            try:
-                # For migration, we need to use the specific date from the entry
-                # not the current date. We'll need to patch the datetime for each entry
-                from unittest.mock import patch
-
-                entry_date = entry["date"]
-                entry_timestamp = entry.get("timestamp", f"{entry_date}T00:00:00")
-
-                with patch("src.sqlite_storage.datetime") as mock_datetime:
-                    mock_datetime.now.return_value.strftime.return_value = entry_date
-                    mock_datetime.now.return_value.isoformat.return_value = (
-                        entry_timestamp
-                    )
-                    sqlite_storage.save_daily_data(entry["results"])
+        with SQLiteStorage(sqlite_db_path) as sqlite_storage:
+            # Load all historical data from JSON
+            history = json_storage.load_history()
+
+            if not history:
+                print("No historical data found in JSON files")
+                return
+
+            print(f"Found {len(history)} historical entries to migrate")
+
+            # Migrate all entries in one transaction, using each entry's own date
+            migrated_count = 0
+            errors: list[str] = []
+            with sqlite_storage.transaction():
+                for entry in history:
+                    try:
+                        entry_date = entry["date"]
+                        entry_timestamp = entry.get(
+                            "timestamp", f"{entry_date}T00:00:00"
+                        )
+                        sqlite_storage.save_daily_data_at(
+                            entry_date, entry_timestamp, entry["results"]
+                        )
+
+                        migrated_count += 1
+
+                        if migrated_count % 10 == 0:
+                            print(
+                                f"Migrated {migrated_count}/{len(history)} entries..."
+                            )
 
-                migrated_count += 1
+                    except Exception as e:
+                        errors.append(f"Error migrating entry for {entry['date']}: {e}")
+                        continue
 
-                if migrated_count % 10 == 0:
-                    print(f"Migrated {migrated_count}/{len(history)} entries...")
+            _print_lines(errors)
 
-            except Exception as e:
-                print(f"Error migrating entry for {entry['date']}: {e}")
-                continue
-
-        print(
-            f"Migration completed: {migrated_count}/{len(history)} entries migrated successfully"
-        )
+            print(
+                f"Migration completed: {migrated_count}/{len(history)} entries migrated successfully"
+            )
 
-        # Show database stats
-        stats = sqlite_storage.get_database_stats()
-        print(f"SQLite database stats: {stats}")
+            # Show database stats
+            stats = sqlite_storage.get_database_stats()
+            print(f"SQLite database stats: {stats}")
 
     @staticmethod
     def sqlite_to_json(
@@ -92,11 +148,11 @@ class StorageMigrator:
             f"Starting export from SQLite ({sqlite_db_path}) to JSON ({json_data_dir})"
         )
 
-        # Initialize storages
-        sqlite_storage = SQLiteStorage(sqlite_db_path)
+        from .sqlite_storage import SQLiteStorage
 
         # Load all historical data from SQLite
-        history = sqlite_storage.load_history()
+        with SQLiteStorage(sqlite_db_path) as sqlite_storage:
+            history = sqlite_storage.load_history()
 
         if not history:
             print("No historical data found in SQLite database")
@@ -105,39 +161,49 @@ class StorageMigrator:
         print(f"Found {len(history)} historical entries to export")
 
         # Create JSON data directory
-        Path(json_data_dir).mkdir(exist_ok=True)
+        export_dir = Path(json_data_dir)
+        export_dir.mkdir(exist_ok=True)
 
-        # Export each historical entry
+        # Encode each entry here and let a thread pool do the file writes, so
+        # writing one file overlaps with encoding the next
         exported_count = 0
-        for entry in history:
-            try:
-                # Create daily JSON file
-                date = entry["date"]
-                daily_file = Path(json_data_dir) / f"daily_{date}.json"
+        errors: list[str] = []
+        with ThreadPoolExecutor(max_workers=EXPORT_WRITE_WORKERS) as pool:
+            pending: list[tuple[str, Future[int]]] = []
+            for entry in history:
+                try:
+                    date = entry["date"]
+                    daily_data = {
+                        "date": date,
+                        "timestamp": entry["timestamp"],
+                        "results": entry["results"],
+                    }
+                    payload = dumps_bytes(daily_data)
+                except Exception as e:
+                    errors.append(f"Error exporting entry for {entry['date']}: {e}")
+                    continue
 
-                daily_data = {
-                    "date": entry["date"],
-                    "timestamp": entry["timestamp"],
-                    "results": entry["results"],
-                }
+                daily_file = export_dir / f"daily_{date}.json"
+                pending.append((date, pool.submit(daily_file.write_bytes, payload)))
 
-                with open(daily_file, "w") as f:
-                    json.dump(daily_data, f, indent=2)
+            for date, write in pending:
+                try:
+                    write.result()
+                except Exception as e:
+                    errors.append(f"Error exporting entry for {date}: {e}")
+                    continue
 
                 exported_count += 1
 
                 if exported_count % 10 == 0:
                     print(f"Exported {exported_count}/{len(history)} entries...")
 
-            except Exception as e:
-                print(f"Error exporting entry for {entry['date']}: {e}")
-                continue
+        _print_lines(errors)
 
         # Create master history file
         try:
-            history_file = Path(json_data_dir) / "league_history.json"
-            with open(history_file, "w") as f:
-                json.dump(history, f, indent=2)
+            history_file = export_dir / "league_history.json"
+            history_file.write_bytes(dumps_bytes(history))
             print(f"Created master history file: {history_file}")
         except Exception as e:
             print(f"Error creating master history file: {e}")
@@ -151,6 +217,7 @@ class StorageMigrator:
         source_storage: StorageInterface,
         target_storage: StorageInterface,
         check_last_n_days: int = 30,
+        fail_fast: bool = True,
     ) -> bool:
         """
         Validate that data migration was successful by comparing data
@@ -159,6 +226,8 @@ class StorageMigrator:
             source_storage: Source storage backend
             target_storage: Target storage backend
             check_last_n_days: Number of recent days to validate
+            fail_fast: Stop at the first mismatch; otherwise report up to
+                MAX_REPORTED_MISMATCHES of them
 
         Returns:
             True if validation passes, False otherwise
@@ -170,66 +239,69 @@ class StorageMigrator:
         try:
             source_history = source_storage.load_history()[-check_last_n_days:]
             target_history = target_storage.load_history()[-check_last_n_days:]
+            return StorageMigrator.compare_histories(
+                source_history, target_history, fail_fast
+            )
 
-            if len(source_history) != len(target_history):
-                print(
-                    f"❌ History length mismatch: source={len(source_history)}, target={len(target_history)}"
-                )
-                return False
-
-            # Compare each day's data
-            mismatches = 0
-            for source_entry, target_entry in zip(source_history, target_history):
-                if source_entry["date"] != target_entry["date"]:
-                    print(
-                        f"❌ Date mismatch: {source_entry['date']} != {target_entry['date']}"
-                    )
-                    mismatches += 1
-                    continue
-
-                # Compare user data
-                source_results = source_entry["results"]
-                target_results = target_entry["results"]
-
-                if set(source_results.keys()) != set(target_results.keys()):
-                    print(f"❌ User set mismatch for {source_entry['date']}")
-                    mismatches += 1
-                    continue
-
-                # Check core fields for each user
-                for username in source_results:
-                    source_user = cast(dict[str, Any], source_results[username])
-                    target_user = cast(dict[str, Any], target_results[username])
-
-                    if "error" in source_user:
-                        continue  # Skip error entries
+        except Exception as e:
+            print(f"❌ Validation error: {e}")
+            return False
 
-                    core_fields = ["streak", "total_xp", "weekly_xp"]
-                    for field in core_fields:
-                        if source_user.get(field) != target_user.get(field):
-                            print(
-                                f"❌ Field mismatch for {username} on {source_entry['date']}: {field}"
-                            )
-                            mismatches += 1
+    @staticmethod
+    def compare_histories(
+        source_history: list[dict[str, Any]],
+        target_history: list[dict[str, Any]],
+        fail_fast: bool = True,
+    ) -> bool:
+        """
+        Compare two already loaded histories entry by entry
 
-            if mismatches == 0:
-                print(
-                    "✅ Migration validation passed - data matches between source and target"
-                )
-                return True
-            else:
-                print(f"❌ Migration validation failed - found {mismatches} mismatches")
-                return False
+        Args:
+            source_history: Source history entries, oldest first
+            target_history: Target history entries, oldest first
+            fail_fast: Stop at the first mismatch; otherwise report up to
+                MAX_REPORTED_MISMATCHES of them
 
-        except Exception as e:
-            print(f"❌ Validation error: {e}")
+        Returns:
+            True if the histories match, False otherwise
+        """
+        if len(source_history) != len(target_history):
+            print(
+                f"❌ History length mismatch: source={len(source_history)}, target={len(target_history)}"
+            )
             return False
 
+        # Compare each day's data, stopping early once the limit is hit. One
+        # extra mismatch is pulled to tell whether any were left unreported.
+        limit = 1 if fail_fast else MAX_REPORTED_MISMATCHES
+        problems = list(
+            islice(_iter_mismatches(source_history, target_history), limit + 1)
+        )
+        stopped_early = len(problems) > limit
+        del problems[limit:]
+        _print_lines(problems)
+        mismatches = len(problems)
+
+        if mismatches == 0:
+            print(
+                "✅ Migration validation passed - data matches between source and target"
+            )
+            return True
+
+        stopped = " (stopped early)" if stopped_early else ""
+        print(
+            f"❌ Migration validation failed - found {mismatches} mismatches{stopped}"
+        )
+        return False
+
 
 def main():
     """CLI interface for data migration"""
     import argparse
 
+    from .data_storage import DataStorage
+    from .sqlite_storage import SQLiteStorage
+
     parser = argparse.ArgumentParser(
         description="Migrate data between JSON and SQLite storage backends"
     )
@@ -257,16 +329,16 @@ def main():
 
         if args.validate:
             json_storage = DataStorage(args.json_dir)
-            sqlite_storage = SQLiteStorage(args.sqlite_path)
-            StorageMigrator.validate_migration(json_storage, sqlite_storage)
+            with SQLiteStorage(args.sqlite_path) as sqlite_storage:
+                StorageMigrator.validate_migration(json_storage, sqlite_storage)
 
     elif args.command == "sqlite-to-json":
         StorageMigrator.sqlite_to_json(args.sqlite_path, args.json_dir)
 
         if args.validate:
-            sqlite_storage = SQLiteStorage(args.sqlite_path)
             json_storage = DataStorage(args.json_dir)
-            StorageMigrator.validate_migration(sqlite_storage, json_storage)
+            with SQLiteStorage(args.sqlite_path) as sqlite_storage:
+                StorageMigrator.validate_migration(sqlite_storage, json_storage)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,25 @@
 """Report generation for Duolingo Family League"""
 
+from collections.abc import Iterator
 from datetime import datetime
-from typing import Any
+from operator import itemgetter
+from typing import Any, cast
+
+# Constant report headings, built once at import
+_DAILY_TITLE = "📊 DUOLINGO FAMILY LEAGUE - DAILY UPDATE"
+_WEEKLY_TITLE = "🏆 DUOLINGO FAMILY LEAGUE - WEEKLY REPORT"
+_SEP45 = "=" * 45
+_SEP55 = "=" * 55
+_RULE25 = "-" * 25
+_RULE22 = "-" * 22
+_RULE30 = "-" * 30
+
+# Medals for the top three places on the leaderboards
+_MEDALS = ("🥇", "🥈", "🥉")
+
+# Leaderboard sort keys: XP for the period first, then streak as tiebreaker
+_DAILY_SORT_KEY = itemgetter("daily_xp", "streak")
+_WEEKLY_SORT_KEY = itemgetter("weekly_xp", "streak")
 
 
 def generate_leaderboard(
@@ -16,45 +34,70 @@ def generate_leaderboard(
     Returns:
         Sorted leaderboard data
     """
-    leaderboard_data: list[dict[str, Any]] = []
+    leaderboard_data = [
+        leaderboard_entry(member_name, data)
+        for member_name, data in results.items()
+        if "error" not in data
+    ]
+    sort_leaderboard(leaderboard_data, sort_by)
+    return leaderboard_data
 
-    for member_name, data in results.items():
-        if "error" not in data:
-            leaderboard_data.append(
-                {
-                    "name": data.get("name", member_name),
-                    "streak": data["streak"],
-                    "weekly_xp": data.get("weekly_xp", 0),
-                    "daily_xp": data.get("daily_xp", 0),
-                    "total_xp": data.get("total_xp", 0),
-                    "target_xp": data.get("total_xp", 0),
-                    "data": data,
-                }
-            )
-
-    # Sort by specified XP type first, then streak as tiebreaker
-    if sort_by == "daily":
-        leaderboard_data.sort(key=lambda x: (x["daily_xp"], x["streak"]), reverse=True)
-    else:
-        leaderboard_data.sort(key=lambda x: (x["weekly_xp"], x["streak"]), reverse=True)
 
-    return leaderboard_data
+def leaderboard_entry(member_name: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Build a leaderboard entry for a member without errors"""
+    total_xp = data.get("total_xp", 0)
+    return {
+        "name": data.get("name", member_name),
+        "streak": data["streak"],
+        "weekly_xp": data.get("weekly_xp", 0),
+        "daily_xp": data.get("daily_xp", 0),
+        "total_xp": total_xp,
+        "target_xp": total_xp,
+        "data": data,
+    }
+
+
+def sort_leaderboard(leaderboard_data: list[dict[str, Any]], sort_by: str) -> None:
+    """Sort leaderboard entries in place"""
+    sort_key = _DAILY_SORT_KEY if sort_by == "daily" else _WEEKLY_SORT_KEY
+    leaderboard_data.sort(key=sort_key, reverse=True)
+
 
+def generate_daily_report(results: dict[str, Any], now: datetime | None = None) -> str:
+    """Generate a concise daily progress report
 
-def generate_daily_report(results: dict[str, Any]) -> str:
-    """Generate a concise daily progress report"""
-    leaderboard = generate_leaderboard(results, sort_by="daily")
+    Args:
+        results: User progress data
+        now: Report timestamp, defaults to the current time
+    """
+    return "\n".join(_emit_daily_report(results, now or datetime.now()))
 
-    report: list[str] = []
-    report.append("📊 DUOLINGO FAMILY LEAGUE - DAILY UPDATE")
-    report.append("=" * 45)
-    report.append(f"Date: {datetime.now().strftime('%Y-%m-%d')}")
-    report.append("")
+
+def _emit_daily_report(results: dict[str, Any], now: datetime) -> Iterator[str]:
+    """Yield the lines of the daily report"""
+    # One pass over the results builds both the standings and the alerts
+    leaderboard: list[dict[str, Any]] = []
+    alerts: list[str] = []
+    for member_name, data in results.items():
+        if "error" in data:
+            continue
+        entry = leaderboard_entry(member_name, data)
+        leaderboard.append(entry)
+        if entry["streak"] == 0:
+            alerts.append(f"  • {entry['name']} needs to practice today!")
+    sort_leaderboard(leaderboard, "daily")
+
+    today = now.strftime("%Y-%m-%d")
+
+    yield _DAILY_TITLE
+    yield _SEP45
+    yield f"Date: {today}"
+    yield ""
 
     # Quick leaderboard
-    report.append("🏆 Today's Standings:")
+    yield "🏆 Today's Standings:"
     for i, member in enumerate(leaderboard, 1):
-        emoji = ["🥇", "🥈", "🥉"][i - 1] if i <= 3 else f"{i}."
+        emoji = _MEDALS[i - 1] if i <= 3 else f"{i}."
         daily_xp_per_lang = member["data"].get("daily_xp_per_language", {})
         weekly_xp_per_lang = member["data"].get("weekly_xp_per_language", {})
         # Get all languages with weekly XP > 0
@@ -66,126 +109,139 @@ def generate_daily_report(results: dict[str, Any]) -> str:
                 daily_xp = daily_xp_per_lang.get(lang, 0)
                 active_langs.append(f"{lang} +{daily_xp} ({weekly_xp} this week)")
         lang_info = f" ({', '.join(active_langs)})" if active_langs else ""
-        report.append(
+        yield (
             f"{emoji} {member['name']}: {member['streak']} day streak | {member['daily_xp']} daily XP{lang_info}"
         )
 
-    report.append("")
+    yield ""
 
     # Streak warnings
-    report.append("⚠️ Streak Alerts:")
-    alerts: list[str] = []
-    for member_name, data in results.items():
-        if "error" not in data and data["streak"] == 0:
-            alerts.append(
-                f"  • {data.get('name', member_name)} needs to practice today!"
-            )
-
+    yield "⚠️ Streak Alerts:"
     if alerts:
-        report.extend(alerts)
+        yield from alerts
     else:
-        report.append("  ✅ Everyone is maintaining their streaks!")
+        yield "  ✅ Everyone is maintaining their streaks!"
+
+    yield "\nKeep learning! 🌟"
 
-    report.append("\nKeep learning! 🌟")
 
-    return "\n".join(report)
+def generate_weekly_report(
+    results: dict[str, Any], goals: dict[str, Any], now: datetime | None = None
+) -> str:
+    """Generate comprehensive weekly family report
 
+    Args:
+        results: User progress data
+        goals: Family goals (streak_goal, weekly_xp_goal)
+        now: Report timestamp, defaults to the current time
+    """
+    return "\n".join(_emit_weekly_report(results, goals, now or datetime.now()))
+
+
+def _emit_weekly_report(
+    results: dict[str, Any], goals: dict[str, Any], now: datetime
+) -> Iterator[str]:
+    """Yield the lines of the weekly report"""
+    streak_goal = goals.get("streak_goal", 7)
+    weekly_goal = goals.get("weekly_xp_goal", 500)
+
+    # One pass over the results builds the leaderboard and the detail lines,
+    # which keep the original member order
+    leaderboard: list[dict[str, Any]] = []
+    details: list[str] = []
+    for member_name, data in results.items():
+        if "error" not in data:
+            leaderboard.append(leaderboard_entry(member_name, data))
+        details.extend(
+            _member_detail_lines(member_name, data, streak_goal, weekly_goal)
+        )
+    sort_leaderboard(leaderboard, "weekly")
 
-def generate_weekly_report(results: dict[str, Any], goals: dict[str, Any]) -> str:
-    """Generate comprehensive weekly family report"""
-    leaderboard = generate_leaderboard(results)
+    today = now.strftime("%Y-%m-%d")
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
 
-    report: list[str] = []
-    report.append("🏆 DUOLINGO FAMILY LEAGUE - WEEKLY REPORT")
-    report.append("=" * 55)
-    report.append(f"Week ending: {datetime.now().strftime('%Y-%m-%d')}")
-    report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    yield _WEEKLY_TITLE
+    yield _SEP55
+    yield f"Week ending: {today}"
+    yield f"Generated: {now_str}\n"
 
     # Overall leaderboard
-    report.append("🥇 FAMILY LEADERBOARD")
-    report.append("-" * 25)
+    yield "🥇 FAMILY LEADERBOARD"
+    yield _RULE25
 
     for i, member in enumerate(leaderboard, 1):
-        if i == 1:
-            trophy = "🥇"
-        elif i == 2:
-            trophy = "🥈"
-        elif i == 3:
-            trophy = "🥉"
-        else:
-            trophy = f"{i}."
-
-        report.append(f"{trophy} {member['name']}")
-        report.append(
+        trophy = _MEDALS[i - 1] if i <= 3 else f"{i}."
+        yield f"{trophy} {member['name']}"
+        yield (
             f"    Streak: {member['streak']} days | Weekly XP: {member['weekly_xp']} | Total XP: {member['total_xp']:,}"
         )
 
-    report.append("")
+    yield ""
 
     # Detailed individual progress
-    report.append("📊 DETAILED PROGRESS")
-    report.append("-" * 22)
+    yield "📊 DETAILED PROGRESS"
+    yield _RULE22
 
-    for member_name, data in results.items():
-        if "error" in data:
-            report.append(f"\n👤 {data.get('name', member_name)}")
-            report.append(f"   ❌ Unable to check progress: {data['error']}")
-            continue
+    yield from details
 
-        report.append(f"\n👤 {data.get('name', member_name)} ({data['username']})")
-        report.append(f"   Current streak: {data['streak']} days")
-
-        # Streak status
-        streak_goal = goals.get("streak_goal", 7)
-        if data["streak"] >= streak_goal:
-            report.append("   🔥 STREAK GOAL ACHIEVED!")
-        elif data["streak"] >= streak_goal // 2:
-            report.append(f"   ⚡ Good progress towards {streak_goal}-day goal")
-        else:
-            report.append(f"   ⚠️  Work needed for {streak_goal}-day streak goal")
-
-        # Weekly XP status
-        weekly_goal = goals.get("weekly_xp_goal", 500)
-        if data["weekly_xp"] >= weekly_goal:
-            report.append(
-                f"   🎯 WEEKLY XP GOAL ACHIEVED! ({data['weekly_xp']}/{weekly_goal})"
-            )
-        else:
-            report.append(
-                f"   📈 Weekly XP progress: {data['weekly_xp']}/{weekly_goal}"
-            )
-
-        # Language-specific progress
-        if data.get("language_progress"):
-            report.append("   📚 Language Progress:")
-            weekly_xp_per_lang = data.get("weekly_xp_per_language", {})
-            for lang, progress in data["language_progress"].items():
-                if progress["xp"] > 0:
-                    weekly_lang_xp = weekly_xp_per_lang.get(lang, 0)
-                    if weekly_lang_xp > 0:
-                        report.append(
-                            f"      {lang}: {progress['xp']:,} XP (+{weekly_lang_xp} this week)"
-                        )
-                    else:
-                        report.append(f"      {lang}: {progress['xp']:,} XP")
-                else:
-                    report.append(f"      {lang}: Not started yet")
-        elif data.get("active_languages"):
-            report.append(
-                f"   📚 Active Languages: {', '.join(data['active_languages'])}"
-            )
+    # Weekly challenges and goals
+    yield "🎯 THIS WEEK'S FAMILY GOALS"
+    yield _RULE30
+    yield f"• Maintain a {streak_goal}-day streak"
+    yield f"• Earn {weekly_goal} XP this week"
+    yield "• Try to beat your personal best!"
+    yield "\nKeep up the great work, everyone! 🌟"
+
+
+def _member_detail_lines(
+    member_name: str, data: dict[str, Any], streak_goal: int, weekly_goal: int
+) -> Iterator[str]:
+    """Yield the detailed progress lines for one member"""
+    if "error" in data:
+        yield f"\n👤 {data.get('name', member_name)}"
+        yield f"   ❌ Unable to check progress: {data['error']}"
+        return
+
+    streak = data["streak"]
+    weekly_xp = data["weekly_xp"]
+    yield f"\n👤 {data.get('name', member_name)} ({data['username']})"
+    yield f"   Current streak: {streak} days"
+
+    # Streak status
+    if streak >= streak_goal:
+        yield "   🔥 STREAK GOAL ACHIEVED!"
+    elif streak >= streak_goal // 2:
+        yield f"   ⚡ Good progress towards {streak_goal}-day goal"
+    else:
+        yield f"   ⚠️  Work needed for {streak_goal}-day streak goal"
 
-        report.append("")
+    # Weekly XP status
+    if weekly_xp >= weekly_goal:
+        yield f"   🎯 WEEKLY XP GOAL ACHIEVED! ({weekly_xp}/{weekly_goal})"
+    else:
+        yield f"   📈 Weekly XP progress: {weekly_xp}/{weekly_goal}"
+
+    # Language-specific progress
+    language_progress = data.get("language_progress")
+    if language_progress:
+        yield "   📚 Language Progress:"
+        weekly_xp_per_lang = cast(
+            dict[str, int], data.get("weekly_xp_per_language") or {}
+        )
+        for lang, progress in language_progress.items():
+            lang_xp = progress["xp"]
+            if lang_xp > 0:
+                weekly_lang_xp = weekly_xp_per_lang.get(lang, 0)
+                if weekly_lang_xp > 0:
+                    yield f"      {lang}: {lang_xp:,} XP (+{weekly_lang_xp} this week)"
+                else:
+                    yield f"      {lang}: {lang_xp:,} XP"
+            else:
+                yield f"      {lang}: Not started yet"
+    elif data.get("active_languages"):
+        yield f"   📚 Active Languages: {', '.join(data['active_languages'])}"
 
-    # Weekly challenges and goals
-    report.append("🎯 THIS WEEK'S FAMILY GOALS")
-    report.append("-" * 30)
-    report.append(f"• Maintain a {goals.get('streak_goal', 7)}-day streak")
-    report.append(f"• Earn {goals.get('weekly_xp_goal', 500)} XP this week")
-    report.append("• Try to beat your personal best!")
-    report.append("\nKeep up the great work, everyone! 🌟")
-
-    return "\n".join(report)
+    yield ""
 
 
 def generate_daily_report_html(results: dict[str, Any]) -> str:
@@ -1,117 +1,390 @@
 """SQLite storage backend for Duolingo Family League data"""
 
-import json
+import os
 import sqlite3
-from datetime import datetime
+import threading
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, cast
 
+from . import json_codec
 from .storage_interface import StorageInterface
 
+# Applied to every connection. WAL lets readers run alongside a writer and
+# only needs fsync at checkpoints; journal_mode is persistent per database.
+CONNECTION_PRAGMAS = """
+    PRAGMA foreign_keys = ON;
+    PRAGMA journal_mode = WAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA cache_size = -20000;
+    PRAGMA mmap_size = 268435456;
+"""
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Current schema version, stored in the metadata table
+SCHEMA_VERSION = 3
+
+# Progress tables, formatted with the table name so schema upgrades can
+# rebuild them. Rows are removed together with their snapshot.
+USER_PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        snapshot_id INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        name TEXT NOT NULL,
+        streak INTEGER NOT NULL,
+        total_xp INTEGER NOT NULL,
+        weekly_xp INTEGER NOT NULL,
+        last_check TEXT NOT NULL,
+        error TEXT NULL,
+        FOREIGN KEY (snapshot_id) REFERENCES daily_snapshots(id) ON DELETE CASCADE
+    );
+"""
+
+LANGUAGE_PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_progress_id INTEGER NOT NULL,
+        language TEXT NOT NULL,
+        xp INTEGER NOT NULL,
+        from_language TEXT NOT NULL,
+        learning_language TEXT NOT NULL,
+        weekly_xp INTEGER DEFAULT 0,
+        FOREIGN KEY (user_progress_id) REFERENCES user_progress(id) ON DELETE CASCADE
+    );
+"""
+
+# The covering indexes answer get_user_progress_history and
+# get_language_progress_history without reading progress table rows. The
+# language one also serves the join from user_progress.
+PROGRESS_INDEXES = """
+    DROP INDEX IF EXISTS idx_user_progress_username;
+    DROP INDEX IF EXISTS idx_language_progress_user;
+    DROP INDEX IF EXISTS idx_language_progress_user_language;
+    CREATE INDEX IF NOT EXISTS idx_user_progress_user_cover
+        ON user_progress(username, snapshot_id, streak, total_xp, weekly_xp, error);
+    CREATE INDEX IF NOT EXISTS idx_user_progress_snapshot
+        ON user_progress(snapshot_id);
+    CREATE INDEX IF NOT EXISTS idx_language_progress_user_cover
+        ON language_progress(user_progress_id, language, xp, weekly_xp);
+    CREATE INDEX IF NOT EXISTS idx_language_progress_language
+        ON language_progress(language);
+"""
+
+# Full schema, created in one transaction rather than one per statement
+SCHEMA_SQL = f"""
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS daily_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        data TEXT NOT NULL,
+        UNIQUE(date)
+    );
+
+    {USER_PROGRESS_TABLE.format(table="user_progress")}
+
+    {LANGUAGE_PROGRESS_TABLE.format(table="language_progress")}
+
+    CREATE TABLE IF NOT EXISTS metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_daily_snapshots_date
+        ON daily_snapshots(date);
+    {PROGRESS_INDEXES}
+    COMMIT;
+"""
+
+# SQLite 3.45+ stores snapshot data of new databases as binary JSONB, which
+# is smaller and faster to process than JSON text. Older versions can't read
+# JSONB, so each database records its format in the metadata table.
+JSONB_SUPPORTED = sqlite3.sqlite_version_info >= (3, 45, 0)
+
+# (insert value, select column) SQL for snapshot data in each format
+DATA_FORMAT_SQL = {
+    "jsonb": ("jsonb(?)", "json(data)"),
+    "text": ("?", "data"),
+}
+
+# Snapshots fetched per round trip when streaming the history
+HISTORY_BATCH_SIZE = 64
+
+
+def _cutoff_date(days: int) -> str:
+    """Snapshot date the given number of days back from today
+
+    Computed the same way save_daily_data() names snapshots, from the local
+    date, so the history windows and cleanup agree on where a day starts.
+    """
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
 
 class SQLiteStorage(StorageInterface):
     """SQLite-based storage for family league data with better scalability"""
 
-    def __init__(self, db_path: str = "league_data/league_data.db") -> None:
+    def __init__(
+        self,
+        db_path: str = "league_data/league_data.db",
+        synchronous: str | None = None,
+    ) -> None:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(exist_ok=True)
-        self._init_database()
+
+        # NORMAL is durable against application crashes in WAL mode; use FULL
+        # to also survive power loss
+        self.synchronous = (
+            synchronous or os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        ).upper()
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"SQLite synchronous mode must be one of {', '.join(SYNCHRONOUS_MODES)}"
+            )
+
+        # One long-lived connection keeps the PRAGMAs applied and prepared
+        # statements cached; the lock serializes access from other threads
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        # Number of iter_history() generators still reading the connection
+        self._open_iterations = 0
+        self._conn = self._connect()
+        try:
+            self._init_database()
+        except BaseException:
+            self._conn.close()
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection configured with the storage PRAGMAs"""
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            cached_statements=256,
+            check_same_thread=False,
+        )
+        conn.executescript(CONNECTION_PRAGMAS)
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        # Fixed once the database is created, so read it only once
+        self._page_size: int = conn.execute("PRAGMA page_size").fetchone()[0]
+        return conn
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            # Let SQLite gather or refresh statistics for any table that needs
+            # them, including ones this session didn't query
+            self._conn.execute("PRAGMA optimize = 0x10002")
+            self._conn.close()
+
+    @contextmanager
+    def transaction(self) -> Generator[sqlite3.Connection]:
+        """Run several writes in a single transaction
+
+        Commits when the block exits cleanly and rolls back on error. The
+        write lock is taken up front with BEGIN IMMEDIATE, so the block never
+        has to upgrade a read lock mid-way. Nested calls run inside a
+        savepoint of the outer transaction, so a failing inner block only
+        undoes its own writes.
+
+        Raises RuntimeError while an iter_history() generator is still open,
+        as its remaining rows would otherwise change under it.
+        """
+        with self._lock:
+            if self._open_iterations:
+                raise RuntimeError(
+                    "Cannot write to the database while iter_history() is "
+                    "still reading it; finish or close the iteration first"
+                )
+            conn = self._conn
+            if self._in_transaction:
+                conn.execute("SAVEPOINT nested_write")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK TO nested_write")
+                    raise
+                finally:
+                    conn.execute("RELEASE nested_write")
+                return
+
+            self._in_transaction = True
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
 
     def _init_database(self) -> None:
         """Initialize database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS daily_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    data TEXT NOT NULL,
-                    UNIQUE(date)
-                );
-                
-                CREATE TABLE IF NOT EXISTS user_progress (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    snapshot_id INTEGER NOT NULL,
-                    username TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    streak INTEGER NOT NULL,
-                    total_xp INTEGER NOT NULL,
-                    weekly_xp INTEGER NOT NULL,
-                    last_check TEXT NOT NULL,
-                    error TEXT NULL,
-                    FOREIGN KEY (snapshot_id) REFERENCES daily_snapshots(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS language_progress (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_progress_id INTEGER NOT NULL,
-                    language TEXT NOT NULL,
-                    xp INTEGER NOT NULL,
-                    from_language TEXT NOT NULL,
-                    learning_language TEXT NOT NULL,
-                    weekly_xp INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_progress_id) REFERENCES user_progress(id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS metadata (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL
-                );
-                
-                -- Indexes for efficient queries
-                CREATE INDEX IF NOT EXISTS idx_daily_snapshots_date 
-                    ON daily_snapshots(date);
-                CREATE INDEX IF NOT EXISTS idx_user_progress_username 
-                    ON user_progress(username);
-                CREATE INDEX IF NOT EXISTS idx_user_progress_snapshot 
-                    ON user_progress(snapshot_id);
-                CREATE INDEX IF NOT EXISTS idx_language_progress_user 
-                    ON language_progress(user_progress_id);
-                CREATE INDEX IF NOT EXISTS idx_language_progress_language 
-                    ON language_progress(language);
-            """)
+        with self._lock:
+            conn = self._conn
+            conn.executescript(SCHEMA_SQL)
 
-            # Set schema version if not exists
+            # Set schema version if not exists, or upgrade older databases
             cursor = conn.execute(
                 "SELECT value FROM metadata WHERE key = 'schema_version'"
             )
-            if not cursor.fetchone():
+            row = cursor.fetchone()
+            upgraded = False
+            if not row:
+                conn.execute(
+                    "INSERT INTO metadata (key, value) VALUES ('schema_version', ?)",
+                    (str(SCHEMA_VERSION),),
+                )
+            elif int(row[0]) < SCHEMA_VERSION:
+                self._migrate_schema(int(row[0]))
+                upgraded = True
+
+            self.data_format = self._read_data_format()
+            self._data_insert_value, self._data_select_column = DATA_FORMAT_SQL[
+                self.data_format
+            ]
+
+            # Gather planner statistics after an upgrade rebuilds the indexes,
+            # and for existing data that has none yet. Empty databases are left
+            # to close(), which analyzes tables once they hold rows.
+            has_stats = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            ).fetchone()
+            has_data = conn.execute("SELECT 1 FROM daily_snapshots LIMIT 1").fetchone()
+            if upgraded or (has_data and not has_stats):
+                conn.execute("ANALYZE")
+
+    def _read_data_format(self) -> str:
+        """Get the snapshot data format, recording it if it isn't yet"""
+        conn = self._conn
+        row = conn.execute(
+            "SELECT value FROM metadata WHERE key = 'data_format'"
+        ).fetchone()
+        if row:
+            data_format: str = row[0]
+        else:
+            # Databases from before the format was recorded keep the format
+            # their snapshots are stored in; empty ones use the best available
+            has_blobs, has_rows = conn.execute("""
+                SELECT
+                    EXISTS(SELECT 1 FROM daily_snapshots WHERE typeof(data) = 'blob'),
+                    EXISTS(SELECT 1 FROM daily_snapshots)
+            """).fetchone()
+            if has_blobs or (JSONB_SUPPORTED and not has_rows):
+                data_format = "jsonb"
+            else:
+                data_format = "text"
+            conn.execute(
+                "INSERT INTO metadata (key, value) VALUES ('data_format', ?)",
+                (data_format,),
+            )
+
+        if data_format == "jsonb" and not JSONB_SUPPORTED:
+            raise RuntimeError(
+                f"{self.db_path} stores snapshot data as JSONB, which needs SQLite "
+                f"3.45 or newer to read (this is SQLite {sqlite3.sqlite_version})"
+            )
+        return data_format
+
+    def _migrate_schema(self, version: int) -> None:
+        """Upgrade the database schema from an older version"""
+        conn = self._conn
+        if version < 2 and JSONB_SUPPORTED:
+            # Convert stored JSON text to JSONB
+            with self.transaction():
                 conn.execute(
-                    "INSERT INTO metadata (key, value) VALUES ('schema_version', '1')"
+                    "UPDATE daily_snapshots SET data = jsonb(data) WHERE typeof(data) = 'text'"
                 )
-            conn.commit()
+
+        if version < 3:
+            # Rebuild the progress tables with ON DELETE CASCADE, dropping rows
+            # orphaned by replaced snapshots. Foreign keys must be off while
+            # tables are swapped.
+            conn.execute("PRAGMA foreign_keys = OFF")
+            conn.executescript(f"""
+                BEGIN;
+                DELETE FROM user_progress
+                    WHERE snapshot_id NOT IN (SELECT id FROM daily_snapshots);
+                DELETE FROM language_progress
+                    WHERE user_progress_id NOT IN (SELECT id FROM user_progress);
+
+                {USER_PROGRESS_TABLE.format(table="user_progress_new")}
+                INSERT INTO user_progress_new SELECT * FROM user_progress;
+                DROP TABLE user_progress;
+                ALTER TABLE user_progress_new RENAME TO user_progress;
+
+                {LANGUAGE_PROGRESS_TABLE.format(table="language_progress_new")}
+                INSERT INTO language_progress_new SELECT * FROM language_progress;
+                DROP TABLE language_progress;
+                ALTER TABLE language_progress_new RENAME TO language_progress;
+
+                {PROGRESS_INDEXES}
+                COMMIT;
+            """)
+            conn.execute("PRAGMA foreign_keys = ON")
+
+        with self.transaction():
+            conn.execute(
+                "UPDATE metadata SET value = ? WHERE key = 'schema_version'",
+                (str(SCHEMA_VERSION),),
+            )
+        conn.execute("VACUUM")
+        print(f"Upgraded SQLite schema from version {version} to {SCHEMA_VERSION}")
 
     def save_daily_data(self, results: dict[str, Any]) -> None:
         """Save daily progress data to SQLite"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        timestamp = datetime.now().isoformat()
+        now = datetime.now()
+        self.save_daily_data_at(now.strftime("%Y-%m-%d"), now.isoformat(), results)
+
+        print(f"Daily data saved to SQLite database: {self.db_path}")
 
-        with sqlite3.connect(self.db_path) as conn:
-            # Insert or replace daily snapshot
+    def save_daily_data_at(
+        self, date: str, timestamp: str, results: dict[str, Any]
+    ) -> None:
+        """Save progress data as the snapshot for a specific date
+
+        Args:
+            date: Snapshot date (YYYY-MM-DD)
+            timestamp: ISO timestamp of the snapshot
+            results: User progress data
+        """
+        with self.transaction() as conn:
+            # Insert or replace daily snapshot; replacing cascades to the
+            # progress rows of the old snapshot
             cursor = conn.execute(
-                "INSERT OR REPLACE INTO daily_snapshots (date, timestamp, data) VALUES (?, ?, ?)",
-                (today, timestamp, json.dumps(results)),
+                "INSERT OR REPLACE INTO daily_snapshots (date, timestamp, data) "
+                f"VALUES (?, ?, {self._data_insert_value}) RETURNING id",
+                (date, timestamp, json_codec.dumps(results)),
             )
-            snapshot_id = cursor.lastrowid
+            snapshot_id: int = cursor.fetchone()[0]
 
-            # Clear existing user progress for this snapshot
-            conn.execute(
-                "DELETE FROM user_progress WHERE snapshot_id = ?", (snapshot_id,)
+            # Pre-assign user_progress ids after the highest one ever handed
+            # out, so language rows can reference them and both tables can be
+            # filled with a single executemany each
+            cursor = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'user_progress'"
             )
-
-            # Insert user progress data
-            for username, user_data in results.items():
+            row = cursor.fetchone()
+            next_user_progress_id = (row[0] if row else 0) + 1
+
+            user_rows: list[tuple[Any, ...]] = []
+            language_rows: list[tuple[Any, ...]] = []
+            for user_progress_id, (username, user_data) in enumerate(
+                results.items(), next_user_progress_id
+            ):
                 data = cast(dict[str, Any], user_data)
                 if "error" in data:
                     # Handle error case
                     last_check: str = data.get("last_check", timestamp)
-                    cursor = conn.execute(
-                        """
-                        INSERT INTO user_progress
-                        (snapshot_id, username, name, streak, total_xp, weekly_xp, last_check, error)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
+                    user_rows.append(
                         (
+                            user_progress_id,
                             snapshot_id,
                             username,
                             username,
@@ -120,58 +393,60 @@ class SQLiteStorage(StorageInterface):
                             0,
                             last_check,
                             data["error"],
-                        ),
+                        )
                     )
-                else:
-                    # Handle successful user data
-                    cursor = conn.execute(
-                        """
-                        INSERT INTO user_progress
-                        (snapshot_id, username, name, streak, total_xp, weekly_xp, last_check, error)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            snapshot_id,
-                            data["username"],
-                            data["name"],
-                            data["streak"],
-                            data["total_xp"],
-                            data["weekly_xp"],
-                            data["last_check"],
-                            None,
-                        ),
+                    continue
+
+                # Handle successful user data
+                user_rows.append(
+                    (
+                        user_progress_id,
+                        snapshot_id,
+                        data["username"],
+                        data["name"],
+                        data["streak"],
+                        data["total_xp"],
+                        data["weekly_xp"],
+                        data["last_check"],
+                        None,
                     )
+                )
 
-                    user_progress_id = cursor.lastrowid
-
-                    # Insert language progress
-                    lang_progress = cast(
-                        dict[str, dict[str, Any]], data.get("language_progress", {})
-                    )
-                    weekly_xp_per_lang = cast(
-                        dict[str, int], data.get("weekly_xp_per_language", {})
+                # Language progress
+                lang_progress = cast(
+                    dict[str, dict[str, Any]], data.get("language_progress", {})
+                )
+                weekly_xp_per_lang = cast(
+                    dict[str, int], data.get("weekly_xp_per_language", {})
+                )
+                language_rows.extend(
+                    (
+                        user_progress_id,
+                        language,
+                        lang_data["xp"],
+                        lang_data["from_language"],
+                        lang_data["learning_language"],
+                        weekly_xp_per_lang.get(language, 0),
                     )
-                    for language, lang_data in lang_progress.items():
-                        weekly_xp: int = weekly_xp_per_lang.get(language, 0)
-                        conn.execute(
-                            """
-                            INSERT INTO language_progress
-                            (user_progress_id, language, xp, from_language, learning_language, weekly_xp)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                            (
-                                user_progress_id,
-                                language,
-                                lang_data["xp"],
-                                lang_data["from_language"],
-                                lang_data["learning_language"],
-                                weekly_xp,
-                            ),
-                        )
-
-            conn.commit()
+                    for language, lang_data in lang_progress.items()
+                )
 
-        print(f"Daily data saved to SQLite database: {self.db_path}")
+            conn.executemany(
+                """
+                INSERT INTO user_progress
+                (id, snapshot_id, username, name, streak, total_xp, weekly_xp, last_check, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                user_rows,
+            )
+            conn.executemany(
+                """
+                INSERT INTO language_progress
+                (user_progress_id, language, xp, from_language, learning_language, weekly_xp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                language_rows,
+            )
 
     def update_history(self, results: dict[str, Any]) -> None:
         """Update history - for SQLite this is handled by save_daily_data"""
@@ -181,57 +456,81 @@ class SQLiteStorage(StorageInterface):
 
     def load_history(self) -> list[dict[str, Any]]:
         """Load historical data from SQLite"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT date, timestamp, data
+        return list(self.iter_history())
+
+    def iter_history(self) -> Iterator[dict[str, Any]]:
+        """Yield historical snapshots oldest first, decoding one batch at a time
+
+        Only a batch of rows is held in memory at once, so callers that do a
+        single pass over the history never need all of it loaded. The cursor
+        stays open until the generator finishes or is closed, and writes to
+        the storage are refused until then.
+        """
+        with self._lock:
+            cursor = self._conn.execute(f"""
+                SELECT date, timestamp, {self._data_select_column}
                 FROM daily_snapshots
                 ORDER BY date ASC
             """)
-
-            history: list[dict[str, Any]] = []
-            for date, timestamp, data_json in cursor.fetchall():
-                results: dict[str, Any] = json.loads(data_json)
-                history.append(
-                    {"date": date, "timestamp": timestamp, "results": results}
-                )
-
-            return history
+            self._open_iterations += 1
+
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(HISTORY_BATCH_SIZE)
+                if not rows:
+                    return
+                for date, timestamp, data_json in rows:
+                    results: dict[str, Any] = json_codec.loads(data_json)
+                    yield {"date": date, "timestamp": timestamp, "results": results}
+        finally:
+            with self._lock:
+                self._open_iterations -= 1
+                cursor.close()
 
     def get_weekly_progress(self) -> list[dict[str, Any]]:
         """Get progress data for the current week"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT date, timestamp, data
-                FROM daily_snapshots
-                ORDER BY date DESC
-                LIMIT 7
+        with self._lock:
+            conn = self._conn
+            # Latest 7 snapshots, returned in chronological order (oldest first)
+            cursor = conn.execute(f"""
+                SELECT date, timestamp, data FROM (
+                    SELECT date, timestamp, {self._data_select_column} AS data
+                    FROM daily_snapshots
+                    ORDER BY date DESC
+                    LIMIT 7
+                )
+                ORDER BY date ASC
             """)
 
             weekly_data: list[dict[str, Any]] = []
             for date, timestamp, data_json in cursor.fetchall():
-                results: dict[str, Any] = json.loads(data_json)
+                results: dict[str, Any] = json_codec.loads(data_json)
                 weekly_data.append(
                     {"date": date, "timestamp": timestamp, "results": results}
                 )
 
-            # Return in chronological order (oldest first)
-            return list(reversed(weekly_data))
+            return weekly_data
 
     def get_user_progress_history(
         self, username: str, days: int = 30
     ) -> list[dict[str, Any]]:
         """Get progress history for a specific user"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock:
+            conn = self._conn
             cursor = conn.execute(
                 """
-                SELECT ds.date, ds.timestamp, up.streak, up.total_xp, up.weekly_xp, up.error
-                FROM daily_snapshots ds
-                JOIN user_progress up ON ds.id = up.snapshot_id
-                WHERE up.username = ?
-                ORDER BY ds.date DESC
-                LIMIT ?
+                SELECT * FROM (
+                    SELECT ds.date, ds.timestamp, up.streak, up.total_xp, up.weekly_xp, up.error
+                    FROM daily_snapshots ds
+                    JOIN user_progress up ON ds.id = up.snapshot_id
+                    WHERE up.username = ? AND ds.date >= ?
+                    ORDER BY ds.date DESC
+                    LIMIT ?
+                )
+                ORDER BY date ASC
             """,
-                (username, days),
+                (username, _cutoff_date(days), days),
             )
 
             history: list[dict[str, Any]] = []
@@ -254,24 +553,29 @@ class SQLiteStorage(StorageInterface):
                     entry["error"] = error
                 history.append(entry)
 
-            return list(reversed(history))  # Return chronological order
+            return history  # Chronological order
 
     def get_language_progress_history(
         self, username: str, language: str, days: int = 30
     ) -> list[dict[str, Any]]:
         """Get language-specific progress history"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock:
+            conn = self._conn
             cursor = conn.execute(
                 """
-                SELECT ds.date, ds.timestamp, lp.xp, lp.weekly_xp
-                FROM daily_snapshots ds
-                JOIN user_progress up ON ds.id = up.snapshot_id
-                JOIN language_progress lp ON up.id = lp.user_progress_id
-                WHERE up.username = ? AND lp.language = ?
-                ORDER BY ds.date DESC
-                LIMIT ?
+                SELECT * FROM (
+                    SELECT ds.date, ds.timestamp, lp.xp, lp.weekly_xp
+                    FROM daily_snapshots ds
+                    JOIN user_progress up ON ds.id = up.snapshot_id
+                    JOIN language_progress lp ON up.id = lp.user_progress_id
+                    WHERE up.username = ? AND lp.language = ?
+                        AND ds.date >= ?
+                    ORDER BY ds.date DESC
+                    LIMIT ?
+                )
+                ORDER BY date ASC
             """,
-                (username, language, days),
+                (username, language, _cutoff_date(days), days),
             )
 
             history: list[dict[str, Any]] = []
@@ -285,43 +589,47 @@ class SQLiteStorage(StorageInterface):
                     }
                 )
 
-            return list(reversed(history))  # Return chronological order
+            return history  # Chronological order
 
     def cleanup_old_data(self, keep_days: int = 90) -> None:
         """Remove old data beyond the specified number of days"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.transaction() as conn:
             # Delete old snapshots and cascading data
             conn.execute(
-                """
-                DELETE FROM daily_snapshots 
-                WHERE date < date('now', '-{} days')
-            """.format(keep_days)
+                "DELETE FROM daily_snapshots WHERE date < ?",
+                (_cutoff_date(keep_days),),
             )
-            conn.commit()
 
         print(f"Cleaned up data older than {keep_days} days")
 
     def get_database_stats(self) -> dict[str, Any]:
         """Get database statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("SELECT COUNT(*) FROM daily_snapshots")
-            daily_snapshots_count = cursor.fetchone()[0]
-
-            cursor = conn.execute("SELECT COUNT(*) FROM user_progress")
-            user_progress_count = cursor.fetchone()[0]
-
-            cursor = conn.execute("SELECT COUNT(*) FROM language_progress")
-            language_progress_count = cursor.fetchone()[0]
-
-            cursor = conn.execute("SELECT MIN(date), MAX(date) FROM daily_snapshots")
-            date_range = cursor.fetchone()
+        with self._lock:
+            conn = self._conn
+            cursor = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM daily_snapshots),
+                    (SELECT COUNT(*) FROM user_progress),
+                    (SELECT COUNT(*) FROM language_progress),
+                    (SELECT MIN(date) FROM daily_snapshots),
+                    (SELECT MAX(date) FROM daily_snapshots),
+                    (SELECT page_count FROM pragma_page_count())
+            """)
+            (
+                daily_snapshots_count,
+                user_progress_count,
+                language_progress_count,
+                start_date,
+                end_date,
+                page_count,
+            ) = cursor.fetchone()
 
             return {
                 "daily_snapshots": daily_snapshots_count,
                 "user_progress_entries": user_progress_count,
                 "language_progress_entries": language_progress_count,
-                "date_range": {"start": date_range[0], "end": date_range[1]},
-                "database_size_mb": self.db_path.stat().st_size / (1024 * 1024)
-                if self.db_path.exists()
-                else 0,
+                "date_range": {"start": start_date, "end": end_date},
+                # Size as seen by the connection, including pages still in
+                # the WAL file
+                "database_size_mb": page_count * self._page_size / (1024 * 1024),
             }
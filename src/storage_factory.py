@@ -1,10 +1,47 @@
 """Storage factory for creating appropriate storage backends"""
 
 import os
+from collections.abc import Callable
 
 from .storage_interface import StorageInterface
-from .data_storage import DataStorage
-from .sqlite_storage import SQLiteStorage
+
+
+# Backend constructors, each importing its module on first use so a run
+# only loads the backend it needs. All take (data_dir, db_path, gist_id,
+# github_token).
+def _create_json(
+    data_dir: str, db_path: str | None, gist_id: str | None, github_token: str | None
+) -> StorageInterface:
+    from .data_storage import DataStorage
+
+    return DataStorage(data_dir)
+
+
+def _create_sqlite(
+    data_dir: str, db_path: str | None, gist_id: str | None, github_token: str | None
+) -> StorageInterface:
+    from .sqlite_storage import SQLiteStorage
+
+    if db_path is None:
+        db_path = os.getenv("SQLITE_DB_PATH", f"{data_dir}/league_data.db")
+    return SQLiteStorage(db_path)
+
+
+def _create_gist(
+    data_dir: str, db_path: str | None, gist_id: str | None, github_token: str | None
+) -> StorageInterface:
+    from .gist_storage import GistStorage
+
+    return GistStorage(gist_id=gist_id, github_token=github_token)
+
+
+_BACKENDS: dict[
+    str, Callable[[str, str | None, str | None, str | None], StorageInterface]
+] = {
+    "json": _create_json,
+    "sqlite": _create_sqlite,
+    "gist": _create_gist,
+}
 
 
 class StorageFactory:
@@ -35,25 +72,18 @@ class StorageFactory:
         if backend is None:
             backend = os.getenv("STORAGE_BACKEND", "json").lower()
 
-        if backend == "sqlite":
-            if db_path is None:
-                db_path = os.getenv("SQLITE_DB_PATH", f"{data_dir}/league_data.db")
-            return SQLiteStorage(db_path)
-        elif backend == "json":
-            return DataStorage(data_dir)
-        elif backend == "gist":
-            from .gist_storage import GistStorage
-
-            return GistStorage(gist_id=gist_id, github_token=github_token)
-        else:
+        try:
+            create = _BACKENDS[backend]
+        except KeyError:
             raise ValueError(
                 f"Unknown storage backend: {backend}. Supported: 'json', 'sqlite', 'gist'"
-            )
+            ) from None
+        return create(data_dir, db_path, gist_id, github_token)
 
     @staticmethod
     def get_available_backends() -> list[str]:
         """Get list of available storage backends"""
-        return ["json", "sqlite", "gist"]
+        return list(_BACKENDS)
 
     @staticmethod
     def get_default_backend() -> str:
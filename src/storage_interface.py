@@ -1,7 +1,8 @@
 """Storage interface and abstract base class for data storage backends"""
 
 from abc import ABC, abstractmethod
-from typing import Any
+from types import TracebackType
+from typing import Any, Self
 
 
 class StorageInterface(ABC):
@@ -26,3 +27,18 @@ class StorageInterface(ABC):
     def get_weekly_progress(self) -> list[dict[str, Any]]:
         """Get progress data for the current week"""
         pass
+
+    def close(self) -> None:
+        """Release resources held by the backend, if any"""
+        pass
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,45 @@
+"""
+Lightweight stand-ins for HTTP and SMTP objects used across the test suite
+"""
+
+from types import SimpleNamespace
+from typing import Any
+
+
+def json_response(payload: Any = None, status_code: int = 200) -> SimpleNamespace:
+    """Successful requests response whose json() returns payload"""
+    return SimpleNamespace(
+        status_code=status_code, json=lambda: payload, raise_for_status=lambda: None
+    )
+
+
+class FakeRequest:
+    """Stand-in for requests.get/patch that records the keyword arguments
+    of each call and returns a successful response with the given JSON"""
+
+    def __init__(self, payload: Any = None) -> None:
+        self.calls: list[dict[str, Any]] = []
+        self.response = json_response(payload)
+
+    def __call__(self, url: str, **kwargs: Any) -> SimpleNamespace:
+        self.calls.append(kwargs)
+        return self.response
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records the methods called on it"""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def starttls(self) -> None:
+        self.calls.append("starttls")
+
+    def login(self, *args: Any) -> None:
+        self.calls.append("login")
+
+    def sendmail(self, *args: Any) -> None:
+        self.calls.append("sendmail")
+
+    def quit(self) -> None:
+        self.calls.append("quit")
@@ -5,14 +5,10 @@ Test suite for Duolingo Family League using pytest
 
 import json
 import os
-import sys
+import smtplib
 import pytest
-from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-import tempfile
-
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import requests
+from datetime import datetime
 
 from src.config import load_config, get_email_config, validate_username, validate_email
 from src.duolingo_api import get_user_progress
@@ -23,12 +19,41 @@ from src.report_generator import (
     generate_weekly_report,
 )
 from src.email_sender import send_email
+from tests._stubs import FakeSMTP, json_response
+
+
+# Duolingo API response used by the user progress tests; never mutated
+USER_PROGRESS_RESPONSE = {
+    "users": [
+        {
+            "name": "Test User",
+            "totalXp": 10000,
+            "streakData": {"currentStreak": {"length": 5}},
+            "courses": [
+                {
+                    "title": "Spanish",
+                    "xp": 5000,
+                    "crowns": 10,
+                    "fromLanguage": "en",
+                    "learningLanguage": "es",
+                },
+                {
+                    "title": "French",
+                    "xp": 3000,
+                    "crowns": 8,
+                    "fromLanguage": "en",
+                    "learningLanguage": "fr",
+                },
+            ],
+            "hasPlus": True,
+        }
+    ]
+}
 
 
-@pytest.fixture
+@pytest.fixture(scope="class")
 def env_setup():
-    """Set up environment variables for testing"""
-    original_env = {}
+    """Set up environment variables for testing, once per test class"""
     test_env = {
         "DUOLINGO_USERNAMES": "test_user_1,test_user_2",
         "WEEKLY_XP_GOAL": "500",
@@ -42,22 +67,13 @@ def env_setup():
         "SEND_WEEKLY": "true",
     }
 
-    # Save original values and set test values
-    for key, value in test_env.items():
-        original_env[key] = os.environ.get(key)
-        os.environ[key] = value
-
-    yield
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in test_env.items():
+            mp.setenv(key, value)
+        yield
 
-    # Restore original values
-    for key, original_value in original_env.items():
-        if original_value is None:
-            os.environ.pop(key, None)
-        else:
-            os.environ[key] = original_value
 
-
-@pytest.fixture
+@pytest.fixture(scope="class")
 def test_config(env_setup):
     """Load test configuration from environment"""
     return load_config()
@@ -86,9 +102,9 @@ class TestConfiguration:
         assert test_config["email_settings"]["send_weekly"]
         assert not test_config["email_settings"]["send_daily"]
 
-    def test_missing_usernames(self):
+    def test_missing_usernames(self, monkeypatch):
         """Test that config returns empty family_members when usernames are missing"""
-        os.environ.pop("DUOLINGO_USERNAMES", None)
+        monkeypatch.delenv("DUOLINGO_USERNAMES", raising=False)
         config = load_config()
         assert config is not None
         assert config["family_members"] == {}
@@ -102,76 +118,54 @@ class TestConfiguration:
         assert email_config["sender_password"] == "test_password"
         assert email_config["family_email_list"] == ["family@test.com"]
 
-    def test_username_validation(self):
-        """Test username validation"""
-        # Valid usernames
-        assert validate_username("test_user")
-        assert validate_username("test.user")
-        assert validate_username("test-user")
-        assert validate_username("test_123")
-
-        # Invalid usernames
-        with pytest.raises(ValueError):
-            validate_username("")  # Empty
+    @pytest.mark.parametrize(
+        "username",
+        ["test_user", "test.user", "test-user", "test_123"],
+    )
+    def test_valid_username(self, username):
+        """Test that valid usernames pass validation"""
+        assert validate_username(username)
+
+    @pytest.mark.parametrize(
+        "username",
+        [
+            "",  # Empty
+            "ab",  # Too short
+            "a" * 31,  # Too long
+            "test@user",  # Invalid character
+            "test user",  # Space not allowed
+        ],
+    )
+    def test_invalid_username(self, username):
+        """Test that invalid usernames are rejected"""
         with pytest.raises(ValueError):
-            validate_username("ab")  # Too short
-        with pytest.raises(ValueError):
-            validate_username("a" * 31)  # Too long
-        with pytest.raises(ValueError):
-            validate_username("test@user")  # Invalid character
-        with pytest.raises(ValueError):
-            validate_username("test user")  # Space not allowed
-
-    def test_email_validation(self):
+            validate_username(username)
+
+    @pytest.mark.parametrize(
+        "email,valid",
+        [
+            ("test@example.com", True),
+            ("user.name@domain.co.uk", True),
+            ("test+tag@example.org", True),
+            ("", False),
+            ("invalid", False),
+            ("@example.com", False),
+            ("test@", False),
+            ("test@.com", False),
+        ],
+    )
+    def test_email_validation(self, email, valid):
         """Test email validation"""
-        # Valid emails
-        assert validate_email("test@example.com")
-        assert validate_email("user.name@domain.co.uk")
-        assert validate_email("test+tag@example.org")
-
-        # Invalid emails
-        assert not validate_email("")
-        assert not validate_email("invalid")
-        assert not validate_email("@example.com")
-        assert not validate_email("test@")
-        assert not validate_email("test@.com")
+        assert validate_email(email) == valid
 
 
 class TestDuolingoIntegration:
     """Test Duolingo API integration"""
 
-    @patch("src.duolingo_api.requests.get")
-    def test_get_user_progress_success(self, mock_get):
+    def test_get_user_progress_success(self, monkeypatch):
         """Test successful user progress retrieval"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            "users": [
-                {
-                    "name": "Test User",
-                    "totalXp": 10000,
-                    "streakData": {"currentStreak": {"length": 5}},
-                    "courses": [
-                        {
-                            "title": "Spanish",
-                            "xp": 5000,
-                            "crowns": 10,
-                            "fromLanguage": "en",
-                            "learningLanguage": "es",
-                        },
-                        {
-                            "title": "French",
-                            "xp": 3000,
-                            "crowns": 8,
-                            "fromLanguage": "en",
-                            "learningLanguage": "fr",
-                        },
-                    ],
-                    "hasPlus": True,
-                }
-            ]
-        }
-        mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        mock_response = json_response(USER_PROGRESS_RESPONSE)
+        monkeypatch.setattr(requests, "get", lambda *args, **kwargs: mock_response)
 
         progress = get_user_progress("test_user")  # type: ignore
 
@@ -187,10 +181,13 @@ class TestDuolingoIntegration:
         assert "Spanish" in progress["active_languages"]  # type: ignore
         assert "French" in progress["active_languages"]  # type: ignore
 
-    @patch("src.duolingo_api.requests.get")
-    def test_get_user_progress_error(self, mock_get):
+    def test_get_user_progress_error(self, monkeypatch):
         """Test error handling in user progress retrieval"""
-        mock_get.side_effect = Exception("API Error")
+
+        def failing_get(*args, **kwargs):
+            raise RuntimeError("API Error")
+
+        monkeypatch.setattr(requests, "get", failing_get)
 
         progress = get_user_progress("test_user")  # type: ignore
 
@@ -202,48 +199,53 @@ class TestDuolingoIntegration:
 class TestDataStorage:
     """Test data saving and history management"""
 
-    def test_save_daily_data(self):
+    def test_save_daily_data(self, tmp_path):
         """Test saving daily progress data"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage = DataStorage(data_dir=tmpdir)
+        storage = DataStorage(data_dir=str(tmp_path))
 
-            test_results = {
-                "TestUser": {"username": "test", "streak": 5, "total_xp": 1000}
-            }
+        test_results = {"TestUser": {"username": "test", "streak": 5, "total_xp": 1000}}
 
-            storage.save_daily_data(test_results)
+        storage.save_daily_data(test_results)
 
-            # Check daily file was created
-            daily_files = list(Path(tmpdir).glob("daily_*.json"))
-            assert len(daily_files) == 1
+        # Check daily file was created
+        daily_files = [
+            entry.name
+            for entry in os.scandir(tmp_path)
+            if entry.name.startswith("daily_") and entry.name.endswith(".json")
+        ]
+        assert len(daily_files) == 1
 
-            # Check history file was created
-            history_file = Path(tmpdir) / "league_history.json"
-            assert history_file.exists()
+        # Check history file was created
+        history_file = tmp_path / "league_history.json"
+        assert history_file.exists()
 
-    def test_history_deduplication(self):
+    def test_history_deduplication(self, tmp_path):
         """Test that duplicate daily entries are avoided"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage = DataStorage(data_dir=tmpdir)
-
-            test_results = {"TestUser": {"username": "test", "streak": 5}}
-
-            # Save twice on the same day
-            storage.save_daily_data(test_results)
-            test_results["TestUser"]["streak"] = 6
-            storage.save_daily_data(test_results)
+        storage = DataStorage(data_dir=str(tmp_path))
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        # Seed the history with an entry saved earlier today
+        history_file = tmp_path / "league_history.json"
+        history_file.write_text(
+            json.dumps(
+                [
+                    {
+                        "date": today,
+                        "results": {"TestUser": {"username": "test", "streak": 5}},
+                    }
+                ]
+            )
+        )
 
-            # Check history has only one entry for today
-            history_file = Path(tmpdir) / "league_history.json"
-            with open(history_file) as f:
-                history = json.load(f)
+        storage.save_daily_data({"TestUser": {"username": "test", "streak": 6}})
 
-            from datetime import datetime
+        # Check history has only one entry for today
+        with open(history_file) as f:
+            history = json.load(f)
 
-            today = datetime.now().strftime("%Y-%m-%d")
-            today_entries = [h for h in history if h.get("date") == today]
-            assert len(today_entries) == 1
-            assert today_entries[0]["results"]["TestUser"]["streak"] == 6
+        today_entries = [h for h in history if h.get("date") == today]
+        assert len(today_entries) == 1
+        assert today_entries[0]["results"]["TestUser"]["streak"] == 6
 
 
 class TestReportGeneration:
@@ -272,10 +274,8 @@ class TestReportGeneration:
 
         leaderboard = generate_leaderboard(results)
 
-        assert len(leaderboard) == 3  # User4 excluded due to error
-        assert leaderboard[0]["name"] == "User2"  # Highest streak
-        assert leaderboard[1]["name"] == "User1"
-        assert leaderboard[2]["name"] == "User3"
+        # Highest streak first; User4 excluded due to error
+        assert [row["name"] for row in leaderboard] == ["User2", "User1", "User3"]
 
     def test_generate_daily_report(self):
         """Test daily report generation"""
@@ -357,37 +357,40 @@ class TestReportGeneration:
         assert "Spanish: 3,000 XP" in report
         assert "French: 2,000 XP" in report
 
+    def test_report_timestamp_can_be_shared(self):
+        """Test that callers can pass the report timestamp"""
+        now = datetime(2025, 8, 17, 9, 30, 0)
+        results = {"User1": {"username": "user1", "streak": 3, "weekly_xp": 20}}
 
-class TestEmailFunctionality:
-    """Test email sending functionality"""
-
-    @patch("src.email_sender.smtplib.SMTP")
-    def test_send_email_success(self, mock_smtp):
-        """Test successful email sending"""
-        mock_server = MagicMock()
-        mock_smtp.return_value = mock_server
+        daily = generate_daily_report(results, now)
+        weekly = generate_weekly_report(results, {}, now)
 
-        email_config = {
-            "smtp_server": "smtp.test.com",
-            "smtp_port": 587,
-            "sender_email": "sender@test.com",
-            "sender_password": "test_password",
-            "family_email_list": ["family@test.com"],
-        }
+        assert "Date: 2025-08-17" in daily
+        assert "Week ending: 2025-08-17" in weekly
+        assert "Generated: 2025-08-17 09:30:00" in weekly
 
-        report = "Test Report Content"
-        result = send_email(report, email_config, "Test - ")
 
-        assert result
-        mock_server.starttls.assert_called_once()
-        mock_server.login.assert_called_once()
-        mock_server.sendmail.assert_called_once()
-        mock_server.quit.assert_called_once()
+class TestEmailFunctionality:
+    """Test email sending functionality"""
 
-    @patch("src.email_sender.smtplib.SMTP")
-    def test_send_email_failure(self, mock_smtp):
-        """Test email sending with error"""
-        mock_smtp.side_effect = Exception("SMTP Error")
+    @pytest.mark.parametrize(
+        "smtp_fails,missing_keys,expected",
+        [
+            (False, (), True),  # Success
+            (True, (), False),  # SMTP error
+            (False, ("sender_email", "sender_password"), False),  # Incomplete config
+        ],
+    )
+    def test_send_email(self, monkeypatch, smtp_fails, missing_keys, expected):
+        """Test email sending outcomes"""
+        server = FakeSMTP()
+
+        def fake_smtp(*args, **kwargs):
+            if smtp_fails:
+                raise RuntimeError("SMTP Error")
+            return server
+
+        monkeypatch.setattr(smtplib, "SMTP", fake_smtp)
 
         email_config = {
             "smtp_server": "smtp.test.com",
@@ -396,26 +399,14 @@ class TestEmailFunctionality:
             "sender_password": "test_password",
             "family_email_list": ["family@test.com"],
         }
+        for key in missing_keys:
+            del email_config[key]
 
-        report = "Test Report"
-        result = send_email(report, email_config, "Test - ")
-
-        assert not result
-
-    def test_email_config_validation(self):
-        """Test email configuration validation"""
-        # Incomplete config
-        email_config = {
-            "smtp_server": "smtp.test.com",
-            "smtp_port": 587,
-            # Missing sender_email and sender_password
-            "family_email_list": ["family@test.com"],
-        }
-
-        report = "Test Report"
-        result = send_email(report, email_config)
+        result = send_email("Test Report", email_config, "Test - ")
 
-        assert not result
+        assert result == expected
+        expected_calls = ["starttls", "login", "sendmail", "quit"] if expected else []
+        assert server.calls == expected_calls
 
 
 if __name__ == "__main__":
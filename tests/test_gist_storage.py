@@ -4,22 +4,51 @@ Test suite for Gist storage backend
 """
 
 import json
-import os
-import sys
 import pytest
-from unittest.mock import Mock, patch
-
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import requests
+import time_machine
+from datetime import datetime
 
 from src.gist_storage import GistStorage
 from src.storage_factory import StorageFactory
+from tests._stubs import FakeRequest
+
+# Gist file contents, serialized once at import
+HISTORY_JSON = json.dumps(
+    [
+        {
+            "date": "2025-08-13",
+            "timestamp": "2025-08-13T10:00:00",
+            "results": {
+                "test_user": {
+                    "username": "test_user",
+                    "name": "Test User",
+                    "streak": 10,
+                    "total_xp": 1500,
+                    "weekly_xp": 200,
+                }
+            },
+        }
+    ]
+)
+
+# 10 days of history, 2025-08-05 to 2025-08-14
+WEEKLY_HISTORY_JSON = json.dumps(
+    [
+        {
+            "date": f"2025-08-{5 + i:02d}",
+            "timestamp": f"2025-08-{5 + i:02d}T10:00:00",
+            "results": {"test_user": {"streak": i}},
+        }
+        for i in range(10)
+    ]
+)
 
 
 class TestGistStorage:
     """Test Gist storage functionality"""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def mock_gist_response(self) -> dict:
         """Mock Gist API response with empty history"""
         return {
@@ -31,34 +60,19 @@ class TestGistStorage:
             },
         }
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def mock_gist_with_history(self) -> dict:
         """Mock Gist API response with existing history"""
-        history = [
-            {
-                "date": "2025-08-13",
-                "timestamp": "2025-08-13T10:00:00",
-                "results": {
-                    "test_user": {
-                        "username": "test_user",
-                        "name": "Test User",
-                        "streak": 10,
-                        "total_xp": 1500,
-                        "weekly_xp": 200,
-                    }
-                },
-            }
-        ]
         return {
             "id": "test_gist_id",
             "files": {
                 "league_history.json": {
-                    "content": json.dumps(history),
+                    "content": HISTORY_JSON,
                 }
             },
         }
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def sample_user_data(self) -> dict:
         """Sample user data for testing"""
         return {
@@ -86,17 +100,18 @@ class TestGistStorage:
             }
         }
 
-    def test_gist_storage_requires_gist_id(self):
+    def test_gist_storage_requires_gist_id(self, monkeypatch):
         """Test that GistStorage requires GIST_ID"""
-        with patch.dict(os.environ, {"GIST_ID": "", "GITHUB_TOKEN": "test_token"}):
-            with pytest.raises(ValueError, match="GIST_ID"):
-                GistStorage(gist_id=None, github_token="test_token")
+        # Only the environment fallback needs clearing; GITHUB_TOKEN is passed
+        monkeypatch.delenv("GIST_ID", raising=False)
+        with pytest.raises(ValueError, match="GIST_ID"):
+            GistStorage(gist_id=None, github_token="test_token")
 
-    def test_gist_storage_requires_github_token(self):
+    def test_gist_storage_requires_github_token(self, monkeypatch):
         """Test that GistStorage requires GITHUB_TOKEN"""
-        with patch.dict(os.environ, {"GIST_ID": "test_id", "GITHUB_TOKEN": ""}):
-            with pytest.raises(ValueError, match="GITHUB_TOKEN"):
-                GistStorage(gist_id="test_id", github_token=None)
+        monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+        with pytest.raises(ValueError, match="GITHUB_TOKEN"):
+            GistStorage(gist_id="test_id", github_token=None)
 
     def test_gist_storage_initialization(self):
         """Test GistStorage initialization with valid credentials"""
@@ -104,25 +119,20 @@ class TestGistStorage:
         assert storage.gist_id == "test_id"
         assert storage.github_token == "test_token"
 
-    @patch("src.gist_storage.requests.get")
-    def test_load_empty_history(self, mock_get, mock_gist_response):
+    def test_load_empty_history(self, monkeypatch, mock_gist_response):
         """Test loading empty history from Gist"""
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_gist_response
-        mock_get.return_value.raise_for_status = Mock()
+        fake_get = FakeRequest(mock_gist_response)
+        monkeypatch.setattr(requests, "get", fake_get)
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
         history = storage.load_history()
 
         assert history == []
-        mock_get.assert_called_once()
+        assert len(fake_get.calls) == 1
 
-    @patch("src.gist_storage.requests.get")
-    def test_load_existing_history(self, mock_get, mock_gist_with_history):
+    def test_load_existing_history(self, monkeypatch, mock_gist_with_history):
         """Test loading existing history from Gist"""
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_gist_with_history
-        mock_get.return_value.raise_for_status = Mock()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_gist_with_history))
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
         history = storage.load_history()
@@ -131,32 +141,20 @@ class TestGistStorage:
         assert history[0]["date"] == "2025-08-13"
         assert "test_user" in history[0]["results"]
 
-    @patch("src.gist_storage.requests.patch")
-    @patch("src.gist_storage.requests.get")
-    def test_save_daily_data(
-        self, mock_get, mock_patch, mock_gist_response, sample_user_data
-    ):
+    def test_save_daily_data(self, monkeypatch, mock_gist_response, sample_user_data):
         """Test saving daily data to Gist"""
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_gist_response
-        mock_get.return_value.raise_for_status = Mock()
-
-        mock_patch.return_value = Mock(status_code=200)
-        mock_patch.return_value.raise_for_status = Mock()
+        fake_patch = FakeRequest()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_gist_response))
+        monkeypatch.setattr(requests, "patch", fake_patch)
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
 
-        with patch("src.gist_storage.datetime") as mock_datetime:
-            mock_datetime.now.return_value.strftime.return_value = "2025-08-14"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-08-14T10:00:00"
-            )
+        with time_machine.travel(datetime(2025, 8, 14, 10).astimezone(), tick=False):
             storage.save_daily_data(sample_user_data)
 
         # Verify PATCH was called with correct data
-        mock_patch.assert_called_once()
-        call_args = mock_patch.call_args
-        payload = call_args.kwargs["json"]
+        assert len(fake_patch.calls) == 1
+        payload = fake_patch.calls[0]["json"]
 
         assert "files" in payload
         assert "league_history.json" in payload["files"]
@@ -165,34 +163,25 @@ class TestGistStorage:
         saved_content = json.loads(payload["files"]["league_history.json"]["content"])
         assert len(saved_content) == 1
         assert saved_content[0]["date"] == "2025-08-14"
+        assert saved_content[0]["timestamp"] == "2025-08-14T10:00:00"
         assert "test_user_1" in saved_content[0]["results"]
 
-    @patch("src.gist_storage.requests.patch")
-    @patch("src.gist_storage.requests.get")
     def test_save_daily_data_replaces_same_day(
-        self, mock_get, mock_patch, mock_gist_with_history, sample_user_data
+        self, monkeypatch, mock_gist_with_history, sample_user_data
     ):
         """Test that saving data for the same day replaces existing entry"""
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_gist_with_history
-        mock_get.return_value.raise_for_status = Mock()
-
-        mock_patch.return_value = Mock(status_code=200)
-        mock_patch.return_value.raise_for_status = Mock()
+        fake_patch = FakeRequest()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_gist_with_history))
+        monkeypatch.setattr(requests, "patch", fake_patch)
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
 
         # Save data for the same date as existing history (2025-08-13)
-        with patch("src.gist_storage.datetime") as mock_datetime:
-            mock_datetime.now.return_value.strftime.return_value = "2025-08-13"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-08-13T15:00:00"
-            )
+        with time_machine.travel(datetime(2025, 8, 13, 15).astimezone(), tick=False):
             storage.save_daily_data(sample_user_data)
 
         # Verify the saved content only has one entry (replaced, not appended)
-        call_args = mock_patch.call_args
-        payload = call_args.kwargs["json"]
+        payload = fake_patch.calls[-1]["json"]
         saved_content = json.loads(payload["files"]["league_history.json"]["content"])
 
         assert len(saved_content) == 1
@@ -200,31 +189,17 @@ class TestGistStorage:
         # Should have the new data, not the old
         assert "test_user_1" in saved_content[0]["results"]
 
-    @patch("src.gist_storage.requests.get")
-    def test_get_weekly_progress(self, mock_get):
+    def test_get_weekly_progress(self, monkeypatch):
         """Test getting weekly progress from Gist"""
-        # Create history with 10 days of data
-        history = []
-        for i in range(10):
-            history.append(
-                {
-                    "date": f"2025-08-{5 + i:02d}",
-                    "timestamp": f"2025-08-{5 + i:02d}T10:00:00",
-                    "results": {"test_user": {"streak": i}},
-                }
-            )
-
         mock_response = {
             "id": "test_gist_id",
             "files": {
                 "league_history.json": {
-                    "content": json.dumps(history),
+                    "content": WEEKLY_HISTORY_JSON,
                 }
             },
         }
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_response
-        mock_get.return_value.raise_for_status = Mock()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_response))
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
         weekly = storage.get_weekly_progress()
@@ -235,46 +210,40 @@ class TestGistStorage:
         assert weekly[0]["date"] == "2025-08-08"
         assert weekly[-1]["date"] == "2025-08-14"
 
-    @patch("src.gist_storage.requests.get")
-    def test_cache_is_used(self, mock_get, mock_gist_with_history):
+    def test_cache_is_used(self, monkeypatch, mock_gist_with_history):
         """Test that history is cached and not re-fetched unnecessarily"""
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_gist_with_history
-        mock_get.return_value.raise_for_status = Mock()
+        fake_get = FakeRequest(mock_gist_with_history)
+        monkeypatch.setattr(requests, "get", fake_get)
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
 
         # First call should fetch from API
         storage.load_history()
-        assert mock_get.call_count == 1
+        assert len(fake_get.calls) == 1
 
         # Second call should use cache
         storage.load_history()
-        assert mock_get.call_count == 1
+        assert len(fake_get.calls) == 1
 
         # Clear cache and call again
         storage.clear_cache()
         storage.load_history()
-        assert mock_get.call_count == 2
+        assert len(fake_get.calls) == 2
 
-    @patch("src.gist_storage.requests.get")
-    def test_handles_missing_file(self, mock_get):
+    def test_handles_missing_file(self, monkeypatch):
         """Test handling when the Gist file doesn't exist yet"""
         mock_response = {
             "id": "test_gist_id",
             "files": {},  # No files
         }
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_response
-        mock_get.return_value.raise_for_status = Mock()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_response))
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
         history = storage.load_history()
 
         assert history == []
 
-    @patch("src.gist_storage.requests.get")
-    def test_handles_invalid_json(self, mock_get):
+    def test_handles_invalid_json(self, monkeypatch):
         """Test handling invalid JSON in Gist file"""
         mock_response = {
             "id": "test_gist_id",
@@ -284,9 +253,7 @@ class TestGistStorage:
                 }
             },
         }
-        mock_get.return_value = Mock(status_code=200)
-        mock_get.return_value.json.return_value = mock_response
-        mock_get.return_value.raise_for_status = Mock()
+        monkeypatch.setattr(requests, "get", FakeRequest(mock_response))
 
         storage = GistStorage(gist_id="test_id", github_token="test_token")
         history = storage.load_history()
@@ -311,19 +278,15 @@ class TestStorageFactoryGist:
         )
         assert isinstance(storage, GistStorage)
 
-    def test_create_gist_storage_from_env(self):
+    def test_create_gist_storage_from_env(self, monkeypatch):
         """Test creating Gist storage from environment variables"""
-        with patch.dict(
-            os.environ,
-            {
-                "STORAGE_BACKEND": "gist",
-                "GIST_ID": "env_gist_id",
-                "GITHUB_TOKEN": "env_token",
-            },
-        ):
-            storage = StorageFactory.create_storage()
-            assert isinstance(storage, GistStorage)
-            assert storage.gist_id == "env_gist_id"
+        monkeypatch.setenv("STORAGE_BACKEND", "gist")
+        monkeypatch.setenv("GIST_ID", "env_gist_id")
+        monkeypatch.setenv("GITHUB_TOKEN", "env_token")
+
+        storage = StorageFactory.create_storage()
+        assert isinstance(storage, GistStorage)
+        assert storage.gist_id == "env_gist_id"
 
     def test_gist_in_available_backends(self):
         """Test that gist is listed as available backend"""
@@ -9,7 +9,15 @@ from src.html_report_generator import (
     generate_weekly_html_report,
 )
 from src.report_generator import generate_daily_report_html, generate_weekly_report_html
-from src.i18n import I18n, get_language_from_env, set_global_language
+from src.i18n import (
+    I18n,
+    _FLAT,
+    _PARSED,
+    _format_cached,
+    _parse_template,
+    get_language_from_env,
+    set_global_language,
+)
 
 
 class TestI18n:
@@ -19,7 +27,63 @@ class TestI18n:
         """Test I18n class initialization"""
         i18n = I18n("en")
         assert i18n.language == "en"
-        assert len(i18n._translations) == 2  # English and Hungarian
+        assert len(i18n.get_available_languages()) == 2  # English and Hungarian
+
+    def test_i18n_tables_loaded_lazily(self):
+        """Test that translation tables are loaded on first use and shared"""
+        I18n._TABLES.pop("hu", None)
+        _format_cached.cache_clear()
+        i18n = I18n("hu")
+        assert "hu" not in I18n._TABLES
+
+        i18n.get("daily_report_header")
+        assert "hu" in I18n._TABLES
+        assert I18n.get_table("hu") is I18n._TABLES["hu"]
+
+    def test_i18n_formatted_results_cached(self):
+        """Test that repeated formatted lookups are served from the cache"""
+        _format_cached.cache_clear()
+        i18n = I18n("en")
+        first = i18n.get("total_xp", count=1500)
+        assert i18n.get("total_xp", count=1500) == first
+        assert _format_cached.cache_info().hits == 1
+
+        # Equal values of different types are cached separately
+        assert i18n.get("total_xp", count=1) == "1 total XP"
+        assert i18n.get("total_xp", count=1.0) == "1.0 total XP"
+
+        # Unhashable arguments bypass the cache
+        assert i18n.get("total_xp", count=2, extra=[1]) == "2 total XP"
+
+    def test_i18n_cache_survives_language_switch(self):
+        """Test that switching language keeps cached results for each language"""
+        _format_cached.cache_clear()
+        i18n = I18n("en")
+        english = i18n.get("total_xp", count=10)
+        i18n.set_language("hu")
+        hungarian = i18n.get("total_xp", count=10)
+        i18n.set_language("en")
+
+        assert i18n.get("total_xp", count=10) == english
+        assert hungarian != english
+        assert _format_cached.cache_info().hits == 1
+
+    def test_i18n_templates_precompiled(self):
+        """Test that templates are parsed once at load time and render like format"""
+        i18n = I18n("en")
+        i18n.get("daily_report_header")
+        assert _PARSED[("en", "total_xp")] is not None
+        assert i18n.get("total_xp", count=1234567) == "1,234,567 total XP"
+        assert _parse_template("{user.name}") is None
+        assert _parse_template("{name!r}") is None
+
+    def test_i18n_nested_keys_flattened(self):
+        """Test that nested keys are looked up from the flattened table"""
+        i18n = I18n("hu")
+        assert i18n.get("languages.Spanish") == _FLAT[("hu", "languages.Spanish")]
+        # A key naming a nested section isn't a translation
+        assert i18n.get("languages") == "languages"
+        assert i18n.get("languages", default="fallback") == "fallback"
 
     def test_i18n_get_translation(self):
         """Test getting translations"""
@@ -317,6 +381,23 @@ class TestHtmlTemplates:
         assert ".status-badge.achieved" in WEEKLY_REPORT_TEMPLATE
         assert ".goals-section" in WEEKLY_REPORT_TEMPLATE
 
+    def test_split_templates_render_like_str_format(self):
+        """Test that pre-split templates render the same as str.format"""
+        from src.html_templates import (
+            DAILY_REPORT_PARTS,
+            DAILY_REPORT_TEMPLATE,
+            WEEKLY_REPORT_PARTS,
+            WEEKLY_REPORT_TEMPLATE,
+            render_template,
+        )
+
+        for template, parts in [
+            (DAILY_REPORT_TEMPLATE, DAILY_REPORT_PARTS),
+            (WEEKLY_REPORT_TEMPLATE, WEEKLY_REPORT_PARTS),
+        ]:
+            fields = {name: f"<{name}> {{x}}" for _, name in parts if name}
+            assert render_template(parts, fields) == template.format_map(fields)
+
 
 class TestDateFormatting:
     """Test date formatting in different languages"""
@@ -3,96 +3,107 @@
 Test suite for SQLite storage backend
 """
 
+import copy
 import json
 import os
-import sys
 import pytest
-import tempfile
+import time_machine
 from pathlib import Path
 from unittest.mock import patch
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from src.sqlite_storage import SQLiteStorage
 from src.storage_factory import StorageFactory
 from src.migrate_storage import StorageMigrator
 from src.data_storage import DataStorage
+from src.json_codec import dumps_bytes
+
+# Shared by all tests in this module; copy it before making changes
+SAMPLE_USER_DATA = {
+    "test_user_1": {
+        "username": "test_user_1",
+        "name": "Test User 1",
+        "streak": 15,
+        "total_xp": 2500,
+        "weekly_xp": 350,
+        "weekly_xp_per_language": {"Spanish": 200, "French": 150},
+        "active_languages": ["Spanish", "French"],
+        "language_progress": {
+            "Spanish": {
+                "xp": 1500,
+                "from_language": "en",
+                "learning_language": "es",
+            },
+            "French": {
+                "xp": 1000,
+                "from_language": "en",
+                "learning_language": "fr",
+            },
+        },
+        "last_check": "2025-08-14 10:00:00",
+    },
+    "test_user_2": {
+        "username": "test_user_2",
+        "name": "Test User 2",
+        "streak": 7,
+        "total_xp": 1200,
+        "weekly_xp": 180,
+        "weekly_xp_per_language": {"German": 180},
+        "active_languages": ["German"],
+        "language_progress": {
+            "German": {
+                "xp": 1200,
+                "from_language": "en",
+                "learning_language": "de",
+            }
+        },
+        "last_check": "2025-08-14 10:00:00",
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def sample_user_data():
+    """Sample user data for testing"""
+    return SAMPLE_USER_DATA
+
+
+@pytest.fixture(scope="module")
+def sample_error_data():
+    """Sample data with user error"""
+    return {
+        "test_user_1": {
+            "username": "test_user_1",
+            "error": "Profile not found",
+            "last_check": "2025-08-14 10:00:00",
+            "language_progress": {},
+            "weekly_xp_per_language": {},
+            "active_languages": [],
+        }
+    }
+
+
+@pytest.fixture(scope="module")
+def populated_storage(sample_user_data, tmp_path_factory):
+    """Storage holding one snapshot of the sample data, shared by read-only tests"""
+    db_path = tmp_path_factory.mktemp("populated") / "league_data.db"
+    storage = SQLiteStorage(str(db_path))
+    storage.save_daily_data(sample_user_data)
+    yield storage
+    storage.close()
 
 
 class TestSQLiteStorage:
     """Test SQLite storage functionality"""
 
     @pytest.fixture
-    def temp_db(self):
-        """Create temporary SQLite database for testing"""
-        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
-            db_path = f.name
-
-        yield db_path
-
-        # Cleanup
-        if os.path.exists(db_path):
-            os.unlink(db_path)
+    def temp_db(self, tmp_path):
+        """Create temporary SQLite database path for testing"""
+        return str(tmp_path / "test.db")
 
     @pytest.fixture
-    def sample_user_data(self):
-        """Sample user data for testing"""
-        return {
-            "test_user_1": {
-                "username": "test_user_1",
-                "name": "Test User 1",
-                "streak": 15,
-                "total_xp": 2500,
-                "weekly_xp": 350,
-                "weekly_xp_per_language": {"Spanish": 200, "French": 150},
-                "active_languages": ["Spanish", "French"],
-                "language_progress": {
-                    "Spanish": {
-                        "xp": 1500,
-                        "from_language": "en",
-                        "learning_language": "es",
-                    },
-                    "French": {
-                        "xp": 1000,
-                        "from_language": "en",
-                        "learning_language": "fr",
-                    },
-                },
-                "last_check": "2025-08-14 10:00:00",
-            },
-            "test_user_2": {
-                "username": "test_user_2",
-                "name": "Test User 2",
-                "streak": 7,
-                "total_xp": 1200,
-                "weekly_xp": 180,
-                "weekly_xp_per_language": {"German": 180},
-                "active_languages": ["German"],
-                "language_progress": {
-                    "German": {
-                        "xp": 1200,
-                        "from_language": "en",
-                        "learning_language": "de",
-                    }
-                },
-                "last_check": "2025-08-14 10:00:00",
-            },
-        }
-
-    @pytest.fixture
-    def sample_error_data(self):
-        """Sample data with user error"""
-        return {
-            "test_user_1": {
-                "username": "test_user_1",
-                "error": "Profile not found",
-                "last_check": "2025-08-14 10:00:00",
-                "language_progress": {},
-                "weekly_xp_per_language": {},
-                "active_languages": [],
-            }
-        }
+    def memory_db(self):
+        """In-memory database for tests that don't need a file on disk"""
+        return ":memory:"
 
     def test_sqlite_storage_initialization(self, temp_db):
         """Test SQLite storage initialization"""
@@ -117,12 +128,142 @@ class TestSQLiteStorage:
             for table in expected_tables:
                 assert table in tables
 
-    def test_save_and_load_daily_data(self, temp_db, sample_user_data):
-        """Test saving and loading daily data"""
+    def test_schema_upgrade_from_version_1(self, temp_db, sample_user_data):
+        """Test that an existing version 1 database is upgraded in place"""
+        import sqlite3
+
+        from src.sqlite_storage import SCHEMA_VERSION
+
         storage = SQLiteStorage(temp_db)
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
+        storage.close()
+        with sqlite3.connect(temp_db) as conn:
+            conn.execute(
+                "UPDATE daily_snapshots SET data = ?", (json.dumps(sample_user_data),)
+            )
+            # Version 1 left progress rows behind when a snapshot was replaced
+            conn.execute(
+                "INSERT INTO user_progress (snapshot_id, username, name, streak, "
+                "total_xp, weekly_xp, last_check) VALUES (999, 'gone', 'Gone', 0, 0, 0, '')"
+            )
+            # Version 1 didn't record the data format
+            conn.execute("DELETE FROM metadata WHERE key = 'data_format'")
+            conn.execute("UPDATE metadata SET value = '1' WHERE key = 'schema_version'")
 
-        # Save data
-        storage.save_daily_data(sample_user_data)
+        storage = SQLiteStorage(temp_db)
+        with sqlite3.connect(temp_db) as conn:
+            version = conn.execute(
+                "SELECT value FROM metadata WHERE key = 'schema_version'"
+            ).fetchone()[0]
+        assert version == str(SCHEMA_VERSION)
+        assert storage.load_history()[0]["results"] == sample_user_data
+        assert storage.get_database_stats()["user_progress_entries"] == 2
+
+    def test_statistics_not_regathered_on_open(self, temp_db, sample_user_data):
+        """Test that opening an analyzed database does not run ANALYZE again"""
+        import sqlite3
+
+        storage = SQLiteStorage(temp_db)
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
+        storage.close()
+        with sqlite3.connect(temp_db) as conn:
+            conn.execute("DELETE FROM sqlite_stat1")
+            conn.execute("INSERT INTO sqlite_stat1 VALUES ('metadata', NULL, '42')")
+
+        SQLiteStorage(temp_db)
+        with sqlite3.connect(temp_db) as conn:
+            stats = conn.execute("SELECT * FROM sqlite_stat1").fetchall()
+        assert stats == [("metadata", None, "42")]
+
+    def test_statistics_gathered_on_close(self, temp_db, sample_user_data):
+        """Test that a new database gets planner statistics once it holds data"""
+        import sqlite3
+
+        storage = SQLiteStorage(temp_db)
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
+        storage.close()
+
+        with sqlite3.connect(temp_db) as conn:
+            indexes = {row[0] for row in conn.execute("SELECT idx FROM sqlite_stat1")}
+        assert "idx_user_progress_user_cover" in indexes
+        assert "idx_language_progress_user_cover" in indexes
+
+    def test_data_format_recorded(self, temp_db, sample_user_data):
+        """Test that a new database records the format its snapshots use"""
+        import sqlite3
+
+        from src.sqlite_storage import JSONB_SUPPORTED
+
+        storage = SQLiteStorage(temp_db)
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
+        storage.close()
+
+        expected = "jsonb" if JSONB_SUPPORTED else "text"
+        with sqlite3.connect(temp_db) as conn:
+            (data_format,) = conn.execute(
+                "SELECT value FROM metadata WHERE key = 'data_format'"
+            ).fetchone()
+            (stored_type,) = conn.execute(
+                "SELECT typeof(data) FROM daily_snapshots"
+            ).fetchone()
+        assert data_format == expected
+        assert stored_type == ("blob" if JSONB_SUPPORTED else "text")
+
+    def test_text_database_stays_text(self, temp_db, sample_user_data):
+        """Test that text snapshot data stays text whatever SQLite opens it"""
+        import sqlite3
+
+        with patch("src.sqlite_storage.JSONB_SUPPORTED", False):
+            storage = SQLiteStorage(temp_db)
+            storage.save_daily_data_at(
+                "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+            )
+            storage.close()
+        # Databases from before the format was recorded are detected too
+        with sqlite3.connect(temp_db) as conn:
+            conn.execute("DELETE FROM metadata WHERE key = 'data_format'")
+
+        storage = SQLiteStorage(temp_db)
+        storage.save_daily_data_at(
+            "2025-08-11", "2025-08-11T10:00:00", sample_user_data
+        )
+        assert storage.data_format == "text"
+        assert [entry["results"] for entry in storage.load_history()] == [
+            sample_user_data,
+            sample_user_data,
+        ]
+        storage.close()
+        with sqlite3.connect(temp_db) as conn:
+            types = conn.execute("SELECT DISTINCT typeof(data) FROM daily_snapshots")
+            assert types.fetchall() == [("text",)]
+
+    def test_jsonb_database_needs_jsonb_support(self, temp_db):
+        """Test that a JSONB database is refused by SQLite without JSONB support"""
+        import sqlite3
+
+        SQLiteStorage(temp_db).close()
+        with sqlite3.connect(temp_db) as conn:
+            conn.execute(
+                "UPDATE metadata SET value = 'jsonb' WHERE key = 'data_format'"
+            )
+
+        with (
+            patch("src.sqlite_storage.JSONB_SUPPORTED", False),
+            pytest.raises(RuntimeError, match="needs SQLite 3.45 or newer"),
+        ):
+            SQLiteStorage(temp_db)
+
+    def test_save_and_load_daily_data(self, populated_storage):
+        """Test saving and loading daily data"""
+        storage = populated_storage
 
         # Load history and verify
         history = storage.load_history()
@@ -145,9 +286,60 @@ class TestSQLiteStorage:
         assert "Spanish" in user1["language_progress"]
         assert "French" in user1["language_progress"]
 
-    def test_save_error_data(self, temp_db, sample_error_data):
+    def test_iter_history_streams_in_batches(self, memory_db, sample_user_data):
+        """Test that the history is streamed oldest first across batches"""
+        storage = SQLiteStorage(memory_db)
+        for day in range(10, 15):
+            storage.save_daily_data_at(
+                f"2025-08-{day}", f"2025-08-{day}T10:00:00", sample_user_data
+            )
+
+        with patch("src.sqlite_storage.HISTORY_BATCH_SIZE", 2):
+            history = storage.iter_history()
+            assert next(history)["date"] == "2025-08-10"
+            dates = [entry["date"] for entry in history]
+        assert dates == ["2025-08-11", "2025-08-12", "2025-08-13", "2025-08-14"]
+        assert storage.load_history()[-1]["results"] == sample_user_data
+
+    def test_iter_history_refuses_writes_until_done(self, memory_db, sample_user_data):
+        """Test that writes can't change the rows an open iteration has left"""
+        storage = SQLiteStorage(memory_db)
+        for day in range(10, 15):
+            storage.save_daily_data_at(
+                f"2025-08-{day}", f"2025-08-{day}T10:00:00", sample_user_data
+            )
+
+        with patch("src.sqlite_storage.HISTORY_BATCH_SIZE", 2):
+            history = storage.iter_history()
+            next(history)
+            with pytest.raises(RuntimeError, match="iter_history"):
+                storage.cleanup_old_data(keep_days=0)
+            dates = [entry["date"] for entry in history]
+        assert dates == ["2025-08-11", "2025-08-12", "2025-08-13", "2025-08-14"]
+
+        # Closing an unfinished iteration allows writes again
+        history = storage.iter_history()
+        next(history)
+        history.close()
+        storage.save_daily_data_at("2025-08-15", "2025-08-15T10:00:00", {})
+        assert storage.get_database_stats()["daily_snapshots"] == 6
+
+    def test_resave_same_day_replaces_progress_rows(self, memory_db, sample_user_data):
+        """Test that saving a day again replaces its progress rows"""
+        storage = SQLiteStorage(memory_db)
+        for _ in range(2):
+            storage.save_daily_data_at(
+                "2025-08-14", "2025-08-14T10:00:00", sample_user_data
+            )
+
+        stats = storage.get_database_stats()
+        assert stats["daily_snapshots"] == 1
+        assert stats["user_progress_entries"] == 2
+        assert stats["language_progress_entries"] == 3
+
+    def test_save_error_data(self, memory_db, sample_error_data):
         """Test saving data with user errors"""
-        storage = SQLiteStorage(temp_db)
+        storage = SQLiteStorage(memory_db)
 
         # Save error data
         storage.save_daily_data(sample_error_data)
@@ -162,29 +354,20 @@ class TestSQLiteStorage:
         user1 = results["test_user_1"]
         assert user1["error"] == "Profile not found"
 
-    def test_multiple_days_data(self, temp_db, sample_user_data):
+    def test_multiple_days_data(self, memory_db, sample_user_data):
         """Test saving data across multiple days"""
-        storage = SQLiteStorage(temp_db)
-
-        # Mock different dates
-        with patch("src.sqlite_storage.datetime") as mock_datetime:
-            # Day 1
-            mock_datetime.now.return_value.strftime.return_value = "2025-08-10"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-08-10T10:00:00"
-            )
-            storage.save_daily_data(sample_user_data)
+        storage = SQLiteStorage(memory_db)
 
-            # Day 2 - modify data slightly
-            modified_data = sample_user_data.copy()
-            modified_data["test_user_1"]["streak"] = 16
-            modified_data["test_user_1"]["total_xp"] = 2650
+        # Day 1
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
 
-            mock_datetime.now.return_value.strftime.return_value = "2025-08-11"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-08-11T10:00:00"
-            )
-            storage.save_daily_data(modified_data)
+        # Day 2 - modify data slightly
+        modified_data = copy.deepcopy(sample_user_data)
+        modified_data["test_user_1"]["streak"] = 16
+        modified_data["test_user_1"]["total_xp"] = 2650
+        storage.save_daily_data_at("2025-08-11", "2025-08-11T10:00:00", modified_data)
 
         # Verify both days are stored
         history = storage.load_history()
@@ -198,19 +381,84 @@ class TestSQLiteStorage:
         assert history[0]["results"]["test_user_1"]["streak"] == 15
         assert history[1]["results"]["test_user_1"]["streak"] == 16
 
-    def test_get_weekly_progress(self, temp_db, sample_user_data):
+    def test_save_daily_data_at_in_transaction(self, memory_db, sample_user_data):
+        """Test saving dated snapshots inside one transaction"""
+        storage = SQLiteStorage(memory_db)
+        broken_data = {
+            "test_user_1": {
+                **sample_user_data["test_user_1"],
+                "language_progress": {"Spanish": {"xp": 1500}},
+            }
+        }
+
+        with storage.transaction():
+            storage.save_daily_data_at(
+                "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+            )
+            # A failing save only rolls back its own rows
+            with pytest.raises(KeyError):
+                storage.save_daily_data_at(
+                    "2025-08-11", "2025-08-11T10:00:00", broken_data
+                )
+
+        history = storage.load_history()
+        assert [entry["date"] for entry in history] == ["2025-08-10"]
+        assert history[0]["timestamp"] == "2025-08-10T10:00:00"
+        assert storage.get_database_stats()["user_progress_entries"] == 2
+
+    def test_failed_save_rolls_back(self, memory_db, sample_user_data):
+        """Test that a failing save leaves no partial snapshot behind"""
+        storage = SQLiteStorage(memory_db)
+        broken_data = {
+            "test_user_1": {
+                **sample_user_data["test_user_1"],
+                "language_progress": {"Spanish": {"xp": 1500}},
+            }
+        }
+
+        with pytest.raises(KeyError):
+            storage.save_daily_data_at("2025-08-10", "2025-08-10T10:00:00", broken_data)
+
+        assert not storage._conn.in_transaction
+        assert storage.load_history() == []
+        assert storage.get_database_stats()["user_progress_entries"] == 0
+
+    def test_close_connection(self, memory_db, sample_user_data):
+        """Test that the storage reuses one connection until closed"""
+        import sqlite3
+
+        storage = SQLiteStorage(memory_db)
+        storage.save_daily_data_at(
+            "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+        )
+        assert len(storage.load_history()) == 1
+
+        storage.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            storage.load_history()
+
+    def test_context_manager_closes_connection(self, memory_db, sample_user_data):
+        """Test that leaving a with block closes the storage"""
+        import sqlite3
+
+        with SQLiteStorage(memory_db) as storage:
+            storage.save_daily_data_at(
+                "2025-08-10", "2025-08-10T10:00:00", sample_user_data
+            )
+            assert len(storage.load_history()) == 1
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            storage.load_history()
+
+    def test_get_weekly_progress(self, memory_db, sample_user_data):
         """Test getting weekly progress data"""
-        storage = SQLiteStorage(temp_db)
+        storage = SQLiteStorage(memory_db)
 
-        # Save multiple days of data
-        for i in range(10):  # More than 7 days
-            with patch("src.sqlite_storage.datetime") as mock_datetime:
+        # Save multiple days of data in a single transaction
+        with storage.transaction():
+            for i in range(10):  # More than 7 days
                 date = f"2025-08-{10 + i:02d}"
-                mock_datetime.now.return_value.strftime.return_value = date
-                mock_datetime.now.return_value.isoformat.return_value = (
-                    f"{date}T10:00:00"
-                )
-                storage.save_daily_data(sample_user_data)
+                storage.save_daily_data_at(date, f"{date}T10:00:00", sample_user_data)
 
         # Get weekly progress (should return last 7 days)
         weekly = storage.get_weekly_progress()
@@ -220,12 +468,9 @@ class TestSQLiteStorage:
         dates = [entry["date"] for entry in weekly]
         assert dates == sorted(dates)
 
-    def test_get_user_progress_history(self, temp_db, sample_user_data):
+    def test_get_user_progress_history(self, populated_storage):
         """Test getting user-specific progress history"""
-        storage = SQLiteStorage(temp_db)
-
-        # Save data
-        storage.save_daily_data(sample_user_data)
+        storage = populated_storage
 
         # Get user history
         user_history = storage.get_user_progress_history("test_user_1")
@@ -236,12 +481,9 @@ class TestSQLiteStorage:
         assert entry["total_xp"] == 2500
         assert entry["weekly_xp"] == 350
 
-    def test_get_language_progress_history(self, temp_db, sample_user_data):
+    def test_get_language_progress_history(self, populated_storage):
         """Test getting language-specific progress history"""
-        storage = SQLiteStorage(temp_db)
-
-        # Save data
-        storage.save_daily_data(sample_user_data)
+        storage = populated_storage
 
         # Get Spanish progress for test_user_1
         lang_history = storage.get_language_progress_history("test_user_1", "Spanish")
@@ -251,12 +493,36 @@ class TestSQLiteStorage:
         assert entry["xp"] == 1500
         assert entry["weekly_xp"] == 200
 
-    def test_database_stats(self, temp_db, sample_user_data):
-        """Test database statistics"""
-        storage = SQLiteStorage(temp_db)
+    def test_progress_history_latest_days_in_order(self, memory_db, sample_user_data):
+        """Test that history queries return the latest days oldest first"""
+        from datetime import datetime
+
+        storage = SQLiteStorage(memory_db)
+        dates = [f"2025-08-{day}" for day in range(10, 15)]
+        # Snapshots older than the requested window are skipped
+        for day in ["2000-01-01", *dates]:
+            storage.save_daily_data_at(day, f"{day}T10:00:00", sample_user_data)
+
+        # Late in the evening, when the UTC date may already be the next day
+        now = datetime(2025, 8, 14, 23, 30).astimezone()
+        with time_machine.travel(now, tick=False):
+            expected = dates[-3:]
+            user_history = storage.get_user_progress_history("test_user_1", days=3)
+            assert [entry["date"] for entry in user_history] == expected
+            lang_history = storage.get_language_progress_history(
+                "test_user_1", "Spanish", days=3
+            )
+            assert [entry["date"] for entry in lang_history] == expected
+            user_history = storage.get_user_progress_history("test_user_1")
+            assert [entry["date"] for entry in user_history] == dates
+
+            # Cleanup cuts off at the same local date as the history window
+            storage.cleanup_old_data(keep_days=3)
+        assert [entry["date"] for entry in storage.load_history()] == dates[-4:]
 
-        # Save data
-        storage.save_daily_data(sample_user_data)
+    def test_database_stats(self, populated_storage):
+        """Test database statistics"""
+        storage = populated_storage
 
         # Get stats
         stats = storage.get_database_stats()
@@ -270,21 +536,15 @@ class TestSQLiteStorage:
         """Test cleaning up old data"""
         storage = SQLiteStorage(temp_db)
 
-        # Save data for multiple days
-        with patch("src.sqlite_storage.datetime") as mock_datetime:
-            # Old data (should be cleaned up)
-            mock_datetime.now.return_value.strftime.return_value = "2025-06-01"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-06-01T10:00:00"
-            )
-            storage.save_daily_data(sample_user_data)
+        # Old data (should be cleaned up)
+        storage.save_daily_data_at(
+            "2025-06-01", "2025-06-01T10:00:00", sample_user_data
+        )
 
-            # Recent data (should be kept)
-            mock_datetime.now.return_value.strftime.return_value = "2025-08-14"
-            mock_datetime.now.return_value.isoformat.return_value = (
-                "2025-08-14T10:00:00"
-            )
-            storage.save_daily_data(sample_user_data)
+        # Recent data (should be kept)
+        storage.save_daily_data_at(
+            "2025-08-14", "2025-08-14T10:00:00", sample_user_data
+        )
 
         # Verify both entries exist
         history_before = storage.load_history()
@@ -304,6 +564,24 @@ class TestSQLiteStorage:
         assert len(history_after) == 1
         assert history_after[0]["date"] == "2025-08-14"
 
+    def test_cleanup_old_data_removes_progress_rows(self, memory_db, sample_user_data):
+        """Test that cleanup deletes old snapshots with their progress rows"""
+        from datetime import date
+
+        storage = SQLiteStorage(memory_db)
+        today = date.today().isoformat()
+        storage.save_daily_data_at(
+            "2000-01-01", "2000-01-01T10:00:00", sample_user_data
+        )
+        storage.save_daily_data_at(today, f"{today}T10:00:00", sample_user_data)
+
+        storage.cleanup_old_data(keep_days=30)
+
+        assert [entry["date"] for entry in storage.load_history()] == [today]
+        stats = storage.get_database_stats()
+        assert stats["user_progress_entries"] == 2
+        assert stats["language_progress_entries"] == 3
+
 
 class TestStorageFactory:
     """Test storage factory functionality"""
@@ -313,17 +591,11 @@ class TestStorageFactory:
         storage = StorageFactory.create_storage("json", "test_data")
         assert isinstance(storage, DataStorage)
 
-    def test_create_sqlite_storage(self):
+    def test_create_sqlite_storage(self, tmp_path):
         """Test creating SQLite storage backend"""
-        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
-            db_path = f.name
-
-        try:
-            storage = StorageFactory.create_storage("sqlite", db_path=db_path)
-            assert isinstance(storage, SQLiteStorage)
-        finally:
-            if os.path.exists(db_path):
-                os.unlink(db_path)
+        db_path = str(tmp_path / "test.db")
+        storage = StorageFactory.create_storage("sqlite", db_path=db_path)
+        assert isinstance(storage, SQLiteStorage)
 
     def test_invalid_backend(self):
         """Test error handling for invalid backend"""
@@ -343,99 +615,78 @@ class TestStorageFactory:
         assert "sqlite" in backends
 
 
-class TestStorageMigration:
-    """Test data migration between storage backends"""
+@pytest.fixture(scope="module")
+def sample_json_data(tmp_path_factory):
+    """Create sample JSON data files, shared by the migration tests"""
+    temp_json_dir = tmp_path_factory.mktemp("json")
+    # Create sample daily file
+    daily_data = {
+        "date": "2025-08-14",
+        "timestamp": "2025-08-14T10:00:00",
+        "results": {
+            "test_user": {
+                "username": "test_user",
+                "name": "Test User",
+                "streak": 10,
+                "total_xp": 1500,
+                "weekly_xp": 200,
+                "weekly_xp_per_language": {"Spanish": 200},
+                "active_languages": ["Spanish"],
+                "language_progress": {
+                    "Spanish": {
+                        "xp": 1500,
+                        "from_language": "en",
+                        "learning_language": "es",
+                    }
+                },
+                "last_check": "2025-08-14 10:00:00",
+            }
+        },
+    }
 
-    @pytest.fixture
-    def temp_json_dir(self):
-        """Create temporary directory for JSON files"""
-        import tempfile
+    daily_file = temp_json_dir / "daily_2025-08-14.json"
+    daily_file.write_bytes(dumps_bytes(daily_data))
 
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
+    # Create master history file
+    history_data = [daily_data]
+    history_file = temp_json_dir / "league_history.json"
+    history_file.write_bytes(dumps_bytes(history_data))
 
-        # Cleanup
-        import shutil
+    return str(temp_json_dir)
 
-        shutil.rmtree(temp_dir)
 
-    @pytest.fixture
-    def temp_db_path(self):
-        """Create temporary SQLite database path"""
-        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
-            db_path = f.name
+@pytest.fixture(scope="module")
+def migrated_db(sample_json_data, tmp_path_factory):
+    """SQLite database migrated once from the sample JSON data"""
+    db_path = str(tmp_path_factory.mktemp("migrated") / "test.db")
+    StorageMigrator.json_to_sqlite(sample_json_data, db_path)
+    return db_path
 
-        yield db_path
 
-        # Cleanup
-        if os.path.exists(db_path):
-            os.unlink(db_path)
+class TestStorageMigration:
+    """Test data migration between storage backends"""
 
     @pytest.fixture
-    def sample_json_data(self, temp_json_dir):
-        """Create sample JSON data files"""
-        # Create sample daily file
-        daily_data = {
-            "date": "2025-08-14",
-            "timestamp": "2025-08-14T10:00:00",
-            "results": {
-                "test_user": {
-                    "username": "test_user",
-                    "name": "Test User",
-                    "streak": 10,
-                    "total_xp": 1500,
-                    "weekly_xp": 200,
-                    "weekly_xp_per_language": {"Spanish": 200},
-                    "active_languages": ["Spanish"],
-                    "language_progress": {
-                        "Spanish": {
-                            "xp": 1500,
-                            "from_language": "en",
-                            "learning_language": "es",
-                        }
-                    },
-                    "last_check": "2025-08-14 10:00:00",
-                }
-            },
-        }
-
-        daily_file = Path(temp_json_dir) / "daily_2025-08-14.json"
-        with open(daily_file, "w") as f:
-            json.dump(daily_data, f)
-
-        # Create master history file
-        history_data = [daily_data]
-        history_file = Path(temp_json_dir) / "league_history.json"
-        with open(history_file, "w") as f:
-            json.dump(history_data, f)
-
-        return temp_json_dir
+    def temp_db_path(self, tmp_path):
+        """Create temporary SQLite database path"""
+        return str(tmp_path / "test.db")
 
-    def test_json_to_sqlite_migration(self, sample_json_data, temp_db_path):
+    def test_json_to_sqlite_migration(self, migrated_db):
         """Test migrating from JSON to SQLite"""
-        # Perform migration
-        StorageMigrator.json_to_sqlite(sample_json_data, temp_db_path)
-
         # Verify migration
-        sqlite_storage = SQLiteStorage(temp_db_path)
+        sqlite_storage = SQLiteStorage(migrated_db)
         history = sqlite_storage.load_history()
 
         assert len(history) == 1
         assert history[0]["date"] == "2025-08-14"
         assert "test_user" in history[0]["results"]
 
-    def test_sqlite_to_json_migration(
-        self, temp_db_path, temp_json_dir, sample_json_data
-    ):
+    def test_sqlite_to_json_migration(self, migrated_db, tmp_path):
         """Test migrating from SQLite to JSON"""
-        # First migrate JSON to SQLite
-        StorageMigrator.json_to_sqlite(sample_json_data, temp_db_path)
-
-        # Create new export directory
-        export_dir = temp_json_dir + "_export"
+        export_dir = str(tmp_path / "export")
 
         # Export SQLite to JSON
-        StorageMigrator.sqlite_to_json(temp_db_path, export_dir)
+        StorageMigrator.sqlite_to_json(migrated_db, export_dir)
 
         # Verify export
         exported_daily_file = Path(export_dir) / "daily_2025-08-14.json"
@@ -451,24 +702,60 @@ class TestStorageMigration:
         assert daily_data["date"] == "2025-08-14"
         assert "test_user" in daily_data["results"]
 
-        # Cleanup
-        import shutil
-
-        shutil.rmtree(export_dir)
-
-    def test_migration_validation(self, sample_json_data, temp_db_path):
+    def test_migration_validation(self, sample_json_data, migrated_db):
         """Test migration validation"""
-        # Perform migration
-        StorageMigrator.json_to_sqlite(sample_json_data, temp_db_path)
-
         # Create storage instances
         json_storage = DataStorage(sample_json_data)
-        sqlite_storage = SQLiteStorage(temp_db_path)
+        sqlite_storage = SQLiteStorage(migrated_db)
 
         # Validate migration
         is_valid = StorageMigrator.validate_migration(json_storage, sqlite_storage)
         assert is_valid is True
 
+    def test_compare_loaded_histories(self, sample_json_data, capsys):
+        """Test comparing histories that are already loaded"""
+        history = DataStorage(sample_json_data).load_history()
+
+        assert StorageMigrator.compare_histories(history, list(history)) is True
+        assert StorageMigrator.compare_histories(history, history[1:]) is False
+        assert "History length mismatch" in capsys.readouterr().out
+
+        # A single mismatch is reported without claiming others were skipped
+        last = history[-1]
+        user = {**last["results"]["test_user"], "streak": 0}
+        changed = [
+            *history[:-1],
+            {**last, "results": {**last["results"], "test_user": user}},
+        ]
+        assert StorageMigrator.compare_histories(history, changed) is False
+        out = capsys.readouterr().out
+        assert "found 1 mismatches" in out
+        assert "stopped early" not in out
+
+    @pytest.mark.parametrize(
+        "fail_fast,reported,stopped", [(True, 1, True), (False, 2, False)]
+    )
+    def test_migration_validation_mismatches(
+        self, sample_json_data, temp_db_path, capsys, fail_fast, reported, stopped
+    ):
+        """Test that validation stops at the first mismatch unless asked not to"""
+        json_storage = DataStorage(sample_json_data)
+        sqlite_storage = SQLiteStorage(temp_db_path)
+        results = json_storage.load_history()[0]["results"]
+        changed = {
+            "test_user": {**results["test_user"], "streak": 11, "total_xp": 1600}
+        }
+        sqlite_storage.save_daily_data_at("2025-08-14", "2025-08-14T10:00:00", changed)
+
+        is_valid = StorageMigrator.validate_migration(
+            json_storage, sqlite_storage, fail_fast=fail_fast
+        )
+
+        assert is_valid is False
+        out = capsys.readouterr().out
+        assert out.count("Field mismatch") == reported
+        assert ("stopped early" in out) is stopped
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
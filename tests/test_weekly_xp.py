@@ -1,233 +1,228 @@
 """Tests for weekly XP calculation functionality"""
 
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import pytest
+import time_machine
 
 from src.duolingo_api import calculate_weekly_xp, calculate_weekly_xp_per_language
 
+# Every test runs at this instant, a Tuesday, so week boundaries are fixed
+FROZEN_NOW = datetime(2026, 1, 20, 12, 0, 0)
 
-class TestWeeklyXPCalculation:
-    """Test weekly XP calculation logic"""
-
-    @pytest.fixture
-    def mock_storage(self):
-        """Mock DataStorage for testing"""
-        with patch("src.data_storage.DataStorage") as MockStorage:
-            yield MockStorage.return_value
-
-    def test_weekly_xp_no_history(self, mock_storage):
-        """Test weekly XP when no history exists"""
-        mock_storage.load_history.return_value = []
-
-        result = calculate_weekly_xp("testuser", 1000)
-
-        assert result == 0
-
-    def test_weekly_xp_with_previous_week_data(self, mock_storage):
-        """Test weekly XP calculation with data from previous week"""
-        today = datetime.now()
-        last_sunday = today - timedelta(days=today.weekday() + 1)
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": last_sunday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 5000}},
-            }
-        ]
-
-        result = calculate_weekly_xp("testuser", 5500)
-
-        assert result == 500
-
-    def test_weekly_xp_current_week_only(self, mock_storage):
-        """Test weekly XP when only current week data exists"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 3000}},
-            },
-            {
-                "date": today.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 3200}},
-            },
-        ]
-
-        result = calculate_weekly_xp("testuser", 3200)
-
-        assert result == 200
-
-    def test_weekly_xp_first_day_of_week(self, mock_storage):
-        """Test weekly XP on first day with no prior data"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 1000}},
-            }
-        ]
-
-        # Same XP as recorded = no progress yet
-        result = calculate_weekly_xp("testuser", 1000)
-
-        assert result == 0
-
-    def test_weekly_xp_case_insensitive_username(self, mock_storage):
-        """Test that username matching is case-insensitive"""
-        today = datetime.now()
-        last_week = today - timedelta(days=7)
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": last_week.strftime("%Y-%m-%d"),
-                "results": {"TestUser": {"username": "TestUser", "total_xp": 2000}},
-            }
-        ]
 
-        result = calculate_weekly_xp("testuser", 2500)
+_MONDAY = FROZEN_NOW - timedelta(days=FROZEN_NOW.weekday())
+_YESTERDAY = FROZEN_NOW - timedelta(days=1)
 
-        assert result == 500
+# Dates around the frozen week, formatted once for all tests
+WEEK_DATES = SimpleNamespace(
+    today_str=FROZEN_NOW.strftime("%Y-%m-%d"),
+    today_iso=FROZEN_NOW.isoformat(),
+    monday_str=_MONDAY.strftime("%Y-%m-%d"),
+    last_sunday_str=(_MONDAY - timedelta(days=1)).strftime("%Y-%m-%d"),
+    last_week_str=(_MONDAY - timedelta(days=3)).strftime("%Y-%m-%d"),
+    yesterday_str=_YESTERDAY.strftime("%Y-%m-%d"),
+    yesterday_iso=_YESTERDAY.isoformat(),
+)
 
-    def test_weekly_xp_username_with_spaces(self, mock_storage):
-        """Test username matching with spaces converted to underscores"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
 
-        mock_storage.load_history.return_value = [
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {"test user": {"username": "test_user", "total_xp": 1500}},
-            }
-        ]
+@pytest.fixture(scope="module", autouse=True)
+def frozen_now():
+    """Freeze the clock for the whole module"""
+    with time_machine.travel(FROZEN_NOW.astimezone(), tick=False):
+        yield FROZEN_NOW
 
-        result = calculate_weekly_xp("test_user", 1700)
 
-        assert result == 200
+def _xp_entry(date, username, total_xp, key=None):
+    """History entry holding one user's total XP"""
+    return {
+        "date": date,
+        "results": {key or username: {"username": username, "total_xp": total_xp}},
+    }
 
-    def test_weekly_xp_mixed_week_data(self, mock_storage):
-        """Test with data from both current and previous weeks"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
-        last_week = monday - timedelta(days=3)
-        yesterday = today - timedelta(days=1)
 
-        mock_storage.load_history.return_value = [
-            {
-                "date": last_week.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 4000}},
-            },
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 4100}},
-            },
-            {
-                "date": yesterday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 4300}},
-            },
-        ]
-
-        # Should use last week's Sunday data as baseline
-        result = calculate_weekly_xp("testuser", 4500)
-
-        assert result == 500  # 4500 - 4000
-
-    def test_weekly_xp_user_not_found(self, mock_storage):
-        """Test when user is not in history"""
-        today = datetime.now()
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": today.strftime("%Y-%m-%d"),
-                "results": {"otheruser": {"username": "otheruser", "total_xp": 1000}},
-            }
-        ]
-
-        result = calculate_weekly_xp("testuser", 5000)
-
-        assert result == 0
+_LANGUAGE_CODES = {"Spanish": "es", "French": "fr", "German": "de"}
 
-    def test_weekly_xp_negative_protection(self, mock_storage):
-        """Test that weekly XP never goes negative"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
 
-        mock_storage.load_history.return_value = [
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 5000}},
-            }
-        ]
+def _languages(**xp):
+    """Language progress for English speakers, keyed by language name"""
+    return {
+        language: {
+            "xp": language_xp,
+            "from_language": "en",
+            "learning_language": _LANGUAGE_CODES[language],
+        }
+        for language, language_xp in xp.items()
+    }
+
+
+def _languages_entry(date, language_progress):
+    """History entry holding testuser's language progress"""
+    return {
+        "date": date,
+        "results": {
+            "testuser": {"username": "testuser", "language_progress": language_progress}
+        },
+    }
+
+
+# Results recorded for a real user, shared by the "actual data" tests below.
+# The functions under test only read their input, so these are never copied.
+_DAAAIN_YESTERDAY = {
+    "username": "daaain",
+    "name": "Daniel",
+    "streak": 288,
+    "total_xp": 181289,
+    "weekly_xp": 0,
+    "active_languages": ["Spanish", "French"],
+    "language_progress": {
+        "Spanish": {"xp": 180932, "from_language": "en", "learning_language": "es"}
+    },
+}
+_DAAAIN_TODAY = {
+    "username": "daaain",
+    "name": "Daniel",
+    "streak": 289,
+    "total_xp": 181946,
+    "weekly_xp": 0,
+    "active_languages": ["Spanish", "French"],
+    "language_progress": {
+        "Spanish": {"xp": 181589, "from_language": "en", "learning_language": "es"}
+    },
+}
+_DAAAIN_LANGUAGES_YESTERDAY = {
+    "username": "daaain",
+    "language_progress": {
+        "Spanish": {"xp": 180932, "from_language": "en", "learning_language": "es"},
+        "French": {"xp": 357, "from_language": "en", "learning_language": "fr"},
+    },
+}
+_DAAAIN_CURRENT_LANGUAGES = {
+    "Spanish": {
+        "level": 9999,
+        "xp": 181589,
+        "from_language": "en",
+        "learning_language": "es",
+    },
+    "French": {
+        "level": 9999,
+        "xp": 357,
+        "from_language": "en",
+        "learning_language": "fr",
+    },
+}
 
-        # Current XP less than historical (shouldn't happen but test protection)
-        result = calculate_weekly_xp("testuser", 4000)
 
-        assert result == 0  # max(0, 4000 - 5000) = 0
+class TestWeeklyXPCalculation:
+    """Test weekly XP calculation logic"""
 
-    def test_weekly_xp_exception_handling(self, mock_storage):
+    @pytest.mark.parametrize(
+        "history,username,current_xp,expected",
+        [
+            pytest.param([], "testuser", 1000, 0, id="no_history"),
+            pytest.param(
+                [_xp_entry(WEEK_DATES.last_sunday_str, "testuser", 5000)],
+                "testuser",
+                5500,
+                500,
+                id="previous_week",
+            ),
+            pytest.param(
+                [
+                    _xp_entry(WEEK_DATES.monday_str, "testuser", 3000),
+                    _xp_entry(WEEK_DATES.today_str, "testuser", 3200),
+                ],
+                "testuser",
+                3200,
+                200,
+                id="current_week_only",
+            ),
+            # Same XP as recorded on Monday = no progress yet
+            pytest.param(
+                [_xp_entry(WEEK_DATES.monday_str, "testuser", 1000)],
+                "testuser",
+                1000,
+                0,
+                id="first_day_of_week",
+            ),
+            pytest.param(
+                [_xp_entry(WEEK_DATES.last_week_str, "TestUser", 2000)],
+                "testuser",
+                2500,
+                500,
+                id="case_insensitive_username",
+            ),
+            pytest.param(
+                [_xp_entry(WEEK_DATES.monday_str, "test_user", 1500, "test user")],
+                "test_user",
+                1700,
+                200,
+                id="username_with_spaces",
+            ),
+            # Last week's entry is the baseline: 4500 - 4000
+            pytest.param(
+                [
+                    _xp_entry(WEEK_DATES.last_week_str, "testuser", 4000),
+                    _xp_entry(WEEK_DATES.monday_str, "testuser", 4100),
+                    _xp_entry(WEEK_DATES.yesterday_str, "testuser", 4300),
+                ],
+                "testuser",
+                4500,
+                500,
+                id="mixed_week_data",
+            ),
+            pytest.param(
+                [_xp_entry(WEEK_DATES.today_str, "otheruser", 1000)],
+                "testuser",
+                5000,
+                0,
+                id="user_not_found",
+            ),
+            # Current XP below the baseline is clamped: max(0, 4000 - 5000)
+            pytest.param(
+                [_xp_entry(WEEK_DATES.monday_str, "testuser", 5000)],
+                "testuser",
+                4000,
+                0,
+                id="negative_protection",
+            ),
+        ],
+    )
+    def test_weekly_xp(self, history, username, current_xp, expected):
+        """Test weekly XP against the baseline found in history"""
+        result = calculate_weekly_xp(username, current_xp, history)
+
+        assert result == expected
+
+    def test_weekly_xp_exception_handling(self):
         """Test exception handling in weekly XP calculation"""
-        mock_storage.load_history.side_effect = Exception("Database error")
+        with patch("src.data_storage.DataStorage") as MockStorage:
+            MockStorage.return_value.load_history.side_effect = Exception(
+                "Database error"
+            )
 
-        result = calculate_weekly_xp("testuser", 1000)
+            result = calculate_weekly_xp("testuser", 1000)
 
         assert result == 0
 
-    def test_weekly_xp_with_actual_data_structure(self, mock_storage):
+    def test_weekly_xp_with_actual_data_structure(self):
         """Test with actual data structure from the application"""
-        today = datetime.now()
-        yesterday = today - timedelta(days=1)
-
-        mock_storage.load_history.return_value = [
+        history = [
             {
-                "date": yesterday.strftime("%Y-%m-%d"),
-                "timestamp": yesterday.isoformat(),
-                "results": {
-                    "daaain": {
-                        "username": "daaain",
-                        "name": "Daniel",
-                        "streak": 288,
-                        "total_xp": 181289,
-                        "weekly_xp": 0,
-                        "active_languages": ["Spanish", "French"],
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 180932,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            }
-                        },
-                    }
-                },
+                "date": WEEK_DATES.yesterday_str,
+                "timestamp": WEEK_DATES.yesterday_iso,
+                "results": {"daaain": _DAAAIN_YESTERDAY},
             },
             {
-                "date": today.strftime("%Y-%m-%d"),
-                "timestamp": today.isoformat(),
-                "results": {
-                    "daaain": {
-                        "username": "daaain",
-                        "name": "Daniel",
-                        "streak": 289,
-                        "total_xp": 181946,
-                        "weekly_xp": 0,
-                        "active_languages": ["Spanish", "French"],
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 181589,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            }
-                        },
-                    }
-                },
+                "date": WEEK_DATES.today_str,
+                "timestamp": WEEK_DATES.today_iso,
+                "results": {"daaain": _DAAAIN_TODAY},
             },
         ]
 
-        result = calculate_weekly_xp("daaain", 181946)
+        result = calculate_weekly_xp("daaain", 181946, history)
 
         assert result == 657  # 181946 - 181289
 
@@ -236,183 +231,74 @@ class TestWeeklyXPPerLanguage:
     """Test per-language weekly XP calculation"""
 
     @pytest.fixture
-    def mock_storage(self):
-        """Mock DataStorage for testing"""
+    def mock_storage(self, request):
+        """Mock DataStorage whose load_history returns the parametrized history"""
         with patch("src.data_storage.DataStorage") as MockStorage:
+            MockStorage.return_value.load_history.return_value = request.param
             yield MockStorage.return_value
 
-    def test_weekly_xp_per_language_no_history(self, mock_storage):
-        """Test weekly XP per language when no history exists"""
-        mock_storage.load_history.return_value = []
-
-        current_languages = {
-            "Spanish": {"xp": 5000, "from_language": "en", "learning_language": "es"},
-            "French": {"xp": 2000, "from_language": "en", "learning_language": "fr"},
-        }
-
-        result = calculate_weekly_xp_per_language("testuser", current_languages)
-
-        assert result == {}
-
-    def test_weekly_xp_per_language_with_baseline(self, mock_storage):
-        """Test weekly XP per language with baseline data"""
-        today = datetime.now()
-        last_sunday = today - timedelta(days=today.weekday() + 1)
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": last_sunday.strftime("%Y-%m-%d"),
-                "results": {
-                    "testuser": {
-                        "username": "testuser",
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 4500,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            },
-                            "French": {
-                                "xp": 1800,
-                                "from_language": "en",
-                                "learning_language": "fr",
-                            },
-                        },
-                    }
-                },
-            }
-        ]
-
-        current_languages = {
-            "Spanish": {"xp": 5000, "from_language": "en", "learning_language": "es"},
-            "French": {"xp": 2000, "from_language": "en", "learning_language": "fr"},
-        }
-
+    @pytest.mark.parametrize(
+        "mock_storage,current_languages,expected",
+        [
+            pytest.param(
+                [],
+                _languages(Spanish=5000, French=2000),
+                {},
+                id="no_history",
+            ),
+            pytest.param(
+                [
+                    _languages_entry(
+                        WEEK_DATES.last_sunday_str,
+                        _languages(Spanish=4500, French=1800),
+                    )
+                ],
+                _languages(Spanish=5000, French=2000),
+                {"Spanish": 500, "French": 200},
+                id="with_baseline",
+            ),
+            # Languages missing from the baseline count all their XP as new
+            pytest.param(
+                [_languages_entry(WEEK_DATES.monday_str, _languages(Spanish=4500))],
+                {**_languages(Spanish=5000, German=150), "French": {"xp": 200}},
+                {"Spanish": 500, "French": 200, "German": 150},
+                id="new_language",
+            ),
+            pytest.param(
+                [
+                    _languages_entry(
+                        WEEK_DATES.yesterday_str,
+                        _languages(Spanish=5000, French=2000),
+                    )
+                ],
+                _languages(Spanish=5000, French=2000),
+                {"Spanish": 0, "French": 0},
+                id="no_progress",
+            ),
+        ],
+        indirect=["mock_storage"],
+    )
+    def test_weekly_xp_per_language(self, mock_storage, current_languages, expected):
+        """Test per-language weekly XP against the baseline found in history"""
         result = calculate_weekly_xp_per_language("testuser", current_languages)
 
-        assert result["Spanish"] == 500  # 5000 - 4500
-        assert result["French"] == 200  # 2000 - 1800
-
-    def test_weekly_xp_per_language_new_language(self, mock_storage):
-        """Test weekly XP when a new language is started this week"""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": monday.strftime("%Y-%m-%d"),
-                "results": {
-                    "testuser": {
-                        "username": "testuser",
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 4500,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            }
-                        },
-                    }
-                },
-            }
-        ]
-
-        current_languages = {
-            "Spanish": {"xp": 5000, "from_language": "en", "learning_language": "es"},
-            "French": {"xp": 200},  # New language
-            "German": {
-                "xp": 150,
-                "from_language": "en",
-                "learning_language": "de",
-            },  # Another new language
-        }
-
-        result = calculate_weekly_xp_per_language("testuser", current_languages)
-
-        assert result["Spanish"] == 500  # 5000 - 4500
-        assert result["French"] == 200  # All XP is new
-        assert result["German"] == 150  # All XP is new
-
-    def test_weekly_xp_per_language_no_progress(self, mock_storage):
-        """Test when no progress was made in any language"""
-        today = datetime.now()
-        yesterday = today - timedelta(days=1)
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": yesterday.strftime("%Y-%m-%d"),
-                "results": {
-                    "testuser": {
-                        "username": "testuser",
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 5000,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            },
-                            "French": {
-                                "xp": 2000,
-                                "from_language": "en",
-                                "learning_language": "fr",
-                            },
-                        },
-                    }
-                },
-            }
-        ]
-
-        current_languages = {
-            "Spanish": {"xp": 5000, "from_language": "en", "learning_language": "es"},
-            "French": {"xp": 2000, "from_language": "en", "learning_language": "fr"},
-        }
-
-        result = calculate_weekly_xp_per_language("testuser", current_languages)
-
-        assert result["Spanish"] == 0
-        assert result["French"] == 0
-
+        assert result == expected
+
+    @pytest.mark.parametrize(
+        "mock_storage",
+        [
+            [
+                {
+                    "date": WEEK_DATES.yesterday_str,
+                    "results": {"daaain": _DAAAIN_LANGUAGES_YESTERDAY},
+                }
+            ]
+        ],
+        indirect=True,
+    )
     def test_weekly_xp_per_language_with_actual_data(self, mock_storage):
         """Test with actual application data structure"""
-        today = datetime.now()
-        yesterday = today - timedelta(days=1)
-
-        mock_storage.load_history.return_value = [
-            {
-                "date": yesterday.strftime("%Y-%m-%d"),
-                "results": {
-                    "daaain": {
-                        "username": "daaain",
-                        "language_progress": {
-                            "Spanish": {
-                                "xp": 180932,
-                                "from_language": "en",
-                                "learning_language": "es",
-                            },
-                            "French": {
-                                "xp": 357,
-                                "from_language": "en",
-                                "learning_language": "fr",
-                            },
-                        },
-                    }
-                },
-            }
-        ]
-
-        current_languages = {
-            "Spanish": {
-                "level": 9999,
-                "xp": 181589,
-                "from_language": "en",
-                "learning_language": "es",
-            },
-            "French": {
-                "level": 9999,
-                "xp": 357,
-                "from_language": "en",
-                "learning_language": "fr",
-            },
-        }
-
-        result = calculate_weekly_xp_per_language("daaain", current_languages)
+        result = calculate_weekly_xp_per_language("daaain", _DAAAIN_CURRENT_LANGUAGES)
 
         assert result["Spanish"] == 657  # 181589 - 180932
         assert result["French"] == 0  # 357 - 357
@@ -529,27 +415,16 @@ class TestReferenceDateParameter:
 
     def test_reference_date_none_uses_current_datetime(self):
         """Test that reference_date=None uses current datetime (default behavior)."""
-        today = datetime.now()
-        monday = today - timedelta(days=today.weekday())
-        last_sunday = monday - timedelta(days=1)
-
         history = [
-            {
-                "date": last_sunday.strftime("%Y-%m-%d"),
-                "results": {"testuser": {"username": "testuser", "total_xp": 1000}},
-            }
+            _xp_entry(WEEK_DATES.last_week_str, "testuser", 800),
+            _xp_entry(WEEK_DATES.last_sunday_str, "testuser", 1000),
         ]
 
-        # Both should give the same result when reference_date=None
-        result_none = calculate_weekly_xp(
-            "testuser", 1500, history, reference_date=None
-        )
-        result_now = calculate_weekly_xp(
-            "testuser", 1500, history, reference_date=datetime.now()
-        )
+        # The frozen week starts on WEEK_DATES.monday_str, so the baseline is
+        # last Sunday's 1000 rather than the earlier 800
+        result = calculate_weekly_xp("testuser", 1500, history, reference_date=None)
 
-        # Allow for minor timing differences
-        assert result_none == result_now
+        assert result == 500
 
     def test_mid_week_reference_date(self):
         """Test reference_date in the middle of a week."""